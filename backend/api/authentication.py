@@ -0,0 +1,196 @@
+from collections import OrderedDict
+import copy
+import threading
+from time import monotonic
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+
+from api.metrics import record_cache_access
+
+User = get_user_model()
+
+VERSION_KEY = 'token_auth:version:{}'
+TOKEN_KEY = 'token_auth:token:{}'
+
+# Поля пользователя, которые не попадают в общий кэш.
+UNCACHED_USER_FIELDS = ('password',)
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+class TokenCache:
+    """Ограниченный по размеру LRU-кэш токенов со временем жизни."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1:]
+
+    def set(self, key, token, version):
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl, token, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for key in [
+                key
+                for key, (_, token, _) in self._entries.items()
+                if token.user_id == user_id
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    settings.TOKEN_AUTH_CACHE_SIZE,
+    settings.TOKEN_AUTH_CACHE_TTL,
+)
+
+
+def get_shared_cache():
+    """Общий для всех процессов кэш TOKEN_AUTH_SHARED_CACHE или None,
+    если кэш не задан или хранится в памяти процесса."""
+    alias = settings.TOKEN_AUTH_SHARED_CACHE
+    if not alias:
+        return None
+    cache = caches[alias]
+    return None if isinstance(cache, PROCESS_LOCAL_CACHES) else cache
+
+
+def get_user_version(shared_cache, user_id):
+    """Версия записей пользователя в общем кэше, меняется при
+    инвалидации."""
+    key = VERSION_KEY.format(user_id)
+    version = shared_cache.get(key)
+    if version is None:
+        shared_cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = shared_cache.get(key)
+    return version
+
+
+def invalidate_user_tokens(user_id):
+    """Сбрасывает закэшированные токены пользователя во всех
+    процессах."""
+    token_cache.discard_user(user_id)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(
+            VERSION_KEY.format(user_id),
+            uuid.uuid4().hex,
+            timeout=None,
+        )
+
+
+def dump_token(token):
+    """Данные токена для общего кэша: дата создания и значения полей
+    пользователя без UNCACHED_USER_FIELDS. Файлы хранятся именами, а не
+    объектами FieldFile со ссылкой на пользователя."""
+    fields = [
+        field
+        for field in User._meta.concrete_fields
+        if field.name not in UNCACHED_USER_FIELDS
+    ]
+    return (
+        token.created,
+        [field.attname for field in fields],
+        [
+            field.get_prep_value(field.value_from_object(token.user))
+            for field in fields
+        ],
+    )
+
+
+def load_token(model, key, data):
+    """Токен из общего кэша. Поля пользователя, которых нет в кэше,
+    отложены: они читаются из базы данных при обращении, а save()
+    их не перезаписывает."""
+    created, names, values = data
+    user = User.from_db(DEFAULT_DB_ALIAS, names, values)
+    return model(key=key, user=user, created=created)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пары токен -> пользователь.
+
+    Локальный LRU-кэш процесса дополняется общим кэшем из
+    TOKEN_AUTH_SHARED_CACHE, через который инвалидация доходит до всех
+    воркеров: при каждом попадании версия записи сверяется с версией
+    пользователя в общем кэше. Без общего кэша токены не кэшируются,
+    иначе удалённый токен принимался бы другими воркерами до истечения
+    TOKEN_AUTH_CACHE_TTL.
+
+    При промахе версия читается до выборки токена из базы данных:
+    инвалидация, случившаяся во время выборки, меняет версию, и
+    сохранённая запись сразу устаревает.
+    """
+
+    def authenticate_credentials(self, key):
+        shared_cache = get_shared_cache()
+        if shared_cache is None:
+            return super().authenticate_credentials(key)
+        entry = token_cache.get(key)
+        if entry is None:
+            data = shared_cache.get(TOKEN_KEY.format(key))
+            if data is not None:
+                entry = (load_token(self.get_model(), key, data[0]), data[1])
+        if entry is not None:
+            token, version = entry
+            user_id = token.user_id
+            current_version = get_user_version(shared_cache, user_id)
+            if version == current_version:
+                record_cache_access('token_auth', hit=True)
+                token_cache.set(key, token, version)
+                return self.copy_credentials(token)
+        else:
+            user_id = (
+                self.get_model()
+                .objects.filter(key=key)
+                .values_list('user_id', flat=True)
+                .first()
+            )
+            if user_id is None:
+                return super().authenticate_credentials(key)
+            current_version = get_user_version(shared_cache, user_id)
+        record_cache_access('token_auth', hit=False)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token, current_version)
+        shared_cache.set(
+            TOKEN_KEY.format(key),
+            (dump_token(token), current_version),
+            timeout=settings.TOKEN_AUTH_CACHE_TTL,
+        )
+        return self.copy_credentials(token)
+
+    @staticmethod
+    def copy_credentials(token):
+        """Копия из кэша, чтобы изменения в запросе не попадали в
+        другие запросы."""
+        user = copy.copy(token.user)
+        token = copy.copy(token)
+        token.user = user
+        return user, token
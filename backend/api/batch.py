@@ -0,0 +1,109 @@
+from io import BytesIO
+from urllib.parse import urlsplit
+import logging
+
+from asgiref.sync import iscoroutinefunction
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+from api.parsers import FastJSONParser
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_META = ('SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR')
+
+SKIPPED_HEADERS = (
+    'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE',
+    'HTTP_ACCEPT_ENCODING',
+)
+
+STREAMING_VIEWS = ('events',)
+
+
+def is_batch_allowed(match):
+    """Можно ли выполнить представление подзапросом: асинхронные
+    представления и бесконечные потоки в пакет не входят."""
+    return (
+        not iscoroutinefunction(match.func)
+        and match.url_name not in STREAMING_VIEWS
+    )
+
+
+def get_subrequest_factory(request):
+    """Фабрика GET-запросов с заголовками, хостом и схемой основного
+    запроса."""
+    meta = request.META
+    return RequestFactory(
+        **{
+            key: value
+            for key, value in meta.items()
+            if (key.startswith('HTTP_') and key not in SKIPPED_HEADERS)
+            or key in FORWARDED_META
+        },
+        **{'wsgi.url_scheme': request.scheme},
+    )
+
+
+def read_body(response):
+    """Тело ответа подзапроса: данные DRF, разобранный JSON или текст.
+    Потоковые ответы и файлы читаются целиком."""
+    if hasattr(response, 'data'):
+        return response.data
+    try:
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+    finally:
+        response.close()
+    if response.get('Content-Type', '').startswith('application/json'):
+        return FastJSONParser().parse(BytesIO(content))
+    return content.decode(response.charset, errors='replace')
+
+
+def run_subrequest(request, factory, path):
+    """Выполнение GET-запроса к path в текущем процессе: (код, тело).
+
+    Пользователь берётся из основного запроса без повторной
+    аутентификации, загрузчики основного запроса общие для всех
+    подзапросов. Ошибка подзапроса возвращается как ответ 500 и не
+    прерывает остальные.
+    """
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return status.HTTP_404_NOT_FOUND, {'detail': 'Страница не найдена.'}
+    subrequest = factory.get(path)
+    subrequest.resolver_match = match
+    if request.user.is_authenticated:
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    subrequest.loaders = request._request.__dict__.setdefault('loaders', {})
+    subrequest.is_batch_subrequest = True
+    try:
+        response = match.func(subrequest, *match.args, **match.kwargs)
+        return response.status_code, read_body(response)
+    except Exception:
+        logger.exception('Ошибка подзапроса %s', path)
+        return (
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {'detail': 'Ошибка сервера.'},
+        )
+
+
+def run_batch(request, items):
+    """Ответы на подзапросы items в порядке следования."""
+    factory = get_subrequest_factory(request)
+    responses = []
+    for position, item in enumerate(items):
+        status_code, body = run_subrequest(request, factory, item['path'])
+        responses.append(
+            {
+                'id': item.get('id', position),
+                'status': status_code,
+                'body': body,
+            },
+        )
+    return responses
@@ -0,0 +1,64 @@
+from hashlib import md5
+from urllib.parse import urlencode
+import uuid
+
+from django.core.cache import cache
+
+from api.metrics import record_cache_access
+
+GENERATION_KEY = 'generation:{}'
+
+
+def get_generation(name):
+    """Текущее поколение данных: меняется при каждом изменении и делает
+    недействительными все ключи кэша, построенные на нём."""
+    key = GENERATION_KEY.format(name)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(key, generation, None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(*names):
+    cache.set_many(
+        {GENERATION_KEY.format(name): uuid.uuid4().hex for name in names},
+        None,
+    )
+
+
+def normalize_params(query_params, names):
+    """Параметры запроса из names в каноническом виде: без повторов и
+    пустых значений, в отсортированном порядке."""
+    return sorted(
+        (name, value)
+        for name in names
+        for value in set(query_params.getlist(name))
+        if value
+    )
+
+
+def make_key(prefix, generations, params):
+    digest = md5(urlencode(params).encode()).hexdigest()
+    versions = ':'.join(get_generation(name) for name in generations)
+    return f'{prefix}:{versions}:{digest}'
+
+
+def make_etag(generations, *parts):
+    """ETag ответа, зависящего только от поколений данных и parts."""
+    versions = ':'.join(get_generation(name) for name in generations)
+    digest = md5('\n'.join((versions, *parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def get_or_compute(prefix, generations, params, compute, timeout):
+    """Значение из кэша по ключу от параметров и поколений данных или
+    результат compute(), сохранённый в кэш."""
+    key = make_key(prefix, generations, params)
+    value = cache.get(key)
+    record_cache_access(prefix, value is not None)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
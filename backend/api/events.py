@@ -0,0 +1,303 @@
+from collections import defaultdict
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from recipes.changelog import get_changes, get_settled_cursor
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = 'foodgram_events'
+
+RESYNC = {'type': 'resync'}
+
+LISTEN_TIMEOUT = 60
+
+RECONNECT_DELAY = 5
+
+
+def publish(event):
+    """Отправка события подключённым клиентам после фиксации транзакции.
+
+    В PostgreSQL событие передаётся через NOTIFY и доходит до всех
+    процессов, с другими базами данных — только до подключений текущего
+    процесса.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                (EVENTS_CHANNEL, json.dumps(event)),
+            )
+    else:
+        transaction.on_commit(lambda: broadcaster.dispatch(event))
+
+
+class Subscriber:
+    """Подключение пользователя с очередью событий ограниченного размера.
+
+    При переполнении очередь очищается и клиент получает событие resync,
+    по которому догружает изменения через /api/sync/.
+    """
+
+    def __init__(self, user_id, authors):
+        self.user_id = user_id
+        self.authors = set(authors)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+
+    def put(self, event):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    def send(self, event):
+        """Передача события из любого потока."""
+        try:
+            self.loop.call_soon_threadsafe(self.put, event)
+        except RuntimeError:
+            pass
+
+
+class Broadcaster:
+    """Рассылка событий подключениям текущего процесса.
+
+    Подключения индексируются по пользователю и по авторам, на которых он
+    подписан, поэтому событие доставляется без перебора всех подключений.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = defaultdict(set)
+        self.authors = defaultdict(set)
+        self.size = 0
+        self.listener = None
+
+    def is_full(self):
+        return self.size >= settings.EVENTS_MAX_CONNECTIONS
+
+    def add(self, subscriber):
+        with self.lock:
+            self.size += 1
+            self.users[subscriber.user_id].add(subscriber)
+            for author_id in subscriber.authors:
+                self.authors[author_id].add(subscriber)
+        self.start()
+
+    def remove(self, subscriber):
+        with self.lock:
+            self.size -= 1
+            self.discard(self.users, subscriber.user_id, subscriber)
+            for author_id in subscriber.authors:
+                self.discard(self.authors, author_id, subscriber)
+
+    @staticmethod
+    def discard(index, key, subscriber):
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del index[key]
+
+    def follow(self, subscriber, author_id, added):
+        if added:
+            subscriber.authors.add(author_id)
+            self.authors[author_id].add(subscriber)
+        else:
+            subscriber.authors.discard(author_id)
+            self.discard(self.authors, author_id, subscriber)
+
+    def dispatch(self, event):
+        with self.lock:
+            if event['type'] == 'recipe':
+                subscribers = list(self.authors.get(event['author'], ()))
+            else:
+                subscribers = list(self.users.get(event['user'], ()))
+            if event['type'] == 'subscription':
+                for subscriber in subscribers:
+                    self.follow(subscriber, event['id'], event['added'])
+        for subscriber in subscribers:
+            subscriber.send(event)
+
+    def dispatch_all(self, event):
+        with self.lock:
+            subscribers = [
+                subscriber
+                for user_subscribers in self.users.values()
+                for subscriber in user_subscribers
+            ]
+        for subscriber in subscribers:
+            subscriber.send(event)
+
+    def start(self):
+        """Запуск потока LISTEN при первом подключении к процессу."""
+        with self.lock:
+            if (
+                self.listener is not None
+                or connections['default'].vendor != 'postgresql'
+            ):
+                return
+            self.listener = threading.Thread(
+                target=self.listen,
+                name='events-listener',
+                daemon=True,
+            )
+        self.listener.start()
+
+    def listen(self):
+        reconnected = False
+        while True:
+            try:
+                self.receive(reconnected)
+            except Exception:
+                logger.exception('Ошибка получения событий')
+            reconnected = True
+            time.sleep(RECONNECT_DELAY)
+
+    def receive(self, reconnected):
+        """Получение событий NOTIFY на отдельном соединении с базой
+        данных. После переподключения клиенты получают resync, так как
+        события за время разрыва потеряны."""
+        wrapper = connections['default']
+        listener = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN {EVENTS_CHANNEL}')
+            if reconnected:
+                self.dispatch_all(RESYNC)
+            while True:
+                if not select.select((listener,), (), (), LISTEN_TIMEOUT)[0]:
+                    continue
+                listener.poll()
+                while listener.notifies:
+                    self.dispatch(json.loads(listener.notifies.pop(0).payload))
+        finally:
+            listener.close()
+
+
+broadcaster = Broadcaster()
+
+
+def format_event(event):
+    """Событие в формате text/event-stream. Событие sync передаётся
+    с курсором журнала в id, который браузер возвращает в Last-Event-ID
+    при переподключении."""
+    lines = [f'event: {event["type"]}']
+    if 'cursor' in event:
+        lines.append(f'id: {event["cursor"]}')
+    data = {
+        key: value
+        for key, value in event.items()
+        if key not in ('type', 'user', 'cursor')
+    }
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def get_token(request):
+    authorization = request.headers.get('Authorization', '').split()
+    if len(authorization) == 2 and authorization[0] == 'Token':
+        return authorization[1]
+    return request.GET.get('token')
+
+
+def get_cursor(request):
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        return max(int(cursor), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def stream_events(user, since):
+    """Поток событий пользователя ограниченной длительности: по истечении
+    EVENTS_MAX_AGE браузер переподключается сам."""
+    authors = await sync_to_async(list)(
+        Subscription.objects.filter(user=user).values_list(
+            'author_id',
+            flat=True,
+        ),
+    )
+    subscriber = Subscriber(user.pk, authors)
+    broadcaster.add(subscriber)
+    try:
+        yield f'retry: {settings.EVENTS_RETRY}\n\n'
+        if since is None:
+            cursor = await sync_to_async(get_settled_cursor)(user)
+            yield f'id: {cursor}\n\n'
+        else:
+            changes, cursor, has_more = await sync_to_async(get_changes)(
+                user,
+                since,
+                settings.SYNC_MAX_CHANGES,
+            )
+            yield format_event(
+                {
+                    'type': 'sync',
+                    'cursor': cursor,
+                    'has_more': has_more,
+                    **changes,
+                },
+            )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EVENTS_MAX_AGE
+        while (timeout := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(),
+                    min(timeout, settings.EVENTS_HEARTBEAT),
+                )
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+            else:
+                yield format_event(event)
+    finally:
+        broadcaster.remove(subscriber)
+
+
+async def events_view(request):
+    """SSE-поток событий пользователя: новые рецепты авторов из подписок
+    и изменения избранного, корзины и подписок с других устройств.
+
+    EventSource не передаёт заголовки, поэтому токен можно указать в
+    ?token=. Курсор из Last-Event-ID или ?since= догружает изменения,
+    пропущенные между подключениями.
+    """
+    key = get_token(request)
+    if not key:
+        return JsonResponse(
+            {'detail': 'Учетные данные не были предоставлены.'},
+            status=401,
+        )
+    try:
+        user, _ = await sync_to_async(
+            CachedTokenAuthentication().authenticate_credentials,
+        )(key)
+    except AuthenticationFailed as error:
+        return JsonResponse({'detail': error.detail}, status=401)
+    if broadcaster.is_full():
+        return JsonResponse(
+            {'detail': 'Слишком много подключений.'},
+            status=503,
+        )
+    response = StreamingHttpResponse(
+        stream_events(user, get_cursor(request)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,59 @@
+from django.db.models import Count, Q
+
+from api.serializers import TagSerializer
+from recipes.constants import COOKING_TIME_BUCKETS, MIN_COOKING_TIME
+from recipes.models import Recipe, Tag
+
+
+def get_cooking_time_buckets():
+    """Интервалы времени приготовления [min, max), последний без
+    верхней границы."""
+    bounds = (MIN_COOKING_TIME, *COOKING_TIME_BUCKETS, None)
+    return tuple(zip(bounds, bounds[1:]))
+
+
+def bucket_filter(low, high):
+    query = Q(cooking_time__gte=low)
+    if high is not None:
+        query &= Q(cooking_time__lt=high)
+    return query
+
+
+def get_facets(queryset):
+    """Кол-во рецептов по тегам и интервалам времени приготовления среди
+    рецептов queryset одним запросом с условной агрегацией."""
+    tags = list(Tag.objects.all())
+    buckets = get_cooking_time_buckets()
+    aggregates = {'count': Count('pk', distinct=True)}
+    aggregates.update(
+        (
+            f'tag_{tag.id}',
+            Count('pk', filter=Q(tags=tag.id), distinct=True),
+        )
+        for tag in tags
+    )
+    aggregates.update(
+        (
+            f'bucket_{position}',
+            Count('pk', filter=bucket_filter(low, high), distinct=True),
+        )
+        for position, (low, high) in enumerate(buckets)
+    )
+    counts = Recipe.objects.filter(
+        pk__in=queryset.order_by().values('pk'),
+    ).aggregate(**aggregates)
+    return {
+        'count': counts['count'],
+        'tags': [
+            dict(TagSerializer(tag).data, count=counts[f'tag_{tag.id}'])
+            for tag in tags
+        ],
+        'cooking_time': [
+            {
+                'min': low,
+                'max': high,
+                'count': counts[f'bucket_{position}'],
+            }
+            for position, (low, high) in enumerate(buckets)
+        ],
+    }
@@ -1,7 +1,7 @@
 from django_filters import FilterSet
 from django_filters.rest_framework import filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 
 
 class IngredientFilter(FilterSet):
@@ -25,22 +25,60 @@ class RecipeFilter(FilterSet):
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='filter_tags',
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные'),
+            ('trending', 'Популярные за последние дни'),
+        ),
+        method='filter_ordering',
     )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author',
+            'tags',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'ordering',
+        )
+
+    def filter_tags(self, queryset, name, value):
+        """Фильтрует рецепты с любым из тегов подзапросом, без JOIN по
+        тегам и DISTINCT."""
+        if not value:
+            return queryset
+        return queryset.filter(
+            pk__in=Recipe.tags.through.objects.filter(
+                tag__in=value,
+            ).values('recipe_id'),
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрует рецепты в избранном."""
         if value:
-            return queryset.filter(users_favorite__user=self.request.user)
+            return queryset.filter(
+                pk__in=Favorite.objects.filter(
+                    user=self.request.user.id,
+                ).values('recipe_id'),
+            )
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """Фильтрует рецепты в корзине."""
         if value:
             return queryset.filter(
-                users_shoppingcart__user=self.request.user,
+                pk__in=ShoppingCart.objects.filter(
+                    user=self.request.user.id,
+                ).values('recipe_id'),
             )
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        """Сортирует рецепты по рейтингу из RecipeRanking."""
+        return queryset.filter(ranking__isnull=False).order_by(
+            f'-ranking__{value}',
+            '-ranking__recipe_id',
+        )
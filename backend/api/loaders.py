@@ -0,0 +1,98 @@
+from collections import namedtuple
+
+from django.db.models import Value
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RecipeFlags = namedtuple(
+    'RecipeFlags',
+    ('is_favorited', 'is_in_shopping_cart'),
+)
+
+NO_FLAGS = RecipeFlags(False, False)
+
+
+class Loader:
+    """Загрузка значений по ключам пачкой с запоминанием на время запроса.
+
+    batch_load получает список ключей, которых ещё нет в памяти, и
+    возвращает словарь {ключ: значение}; отсутствующие в нём ключи
+    получают значение default.
+    """
+
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self.values = {}
+
+    def load_many(self, keys):
+        keys = list(keys)
+        missing = [key for key in set(keys) if key not in self.values]
+        if missing:
+            loaded = self.batch_load(missing)
+            self.values.update(
+                (key, loaded.get(key, self.default)) for key in missing
+            )
+        return {key: self.values[key] for key in keys}
+
+    def load(self, key):
+        return self.load_many((key,))[key]
+
+
+def get_loader(request, name, batch_load, default=None):
+    """Загрузчик name текущего запроса. Подзапросы /api/batch/ получают
+    словарь загрузчиков основного запроса и используют его данные."""
+    request = getattr(request, '_request', request)
+    loaders = request.__dict__.setdefault('loaders', {})
+    if name not in loaders:
+        loaders[name] = Loader(batch_load, default)
+    return loaders[name]
+
+
+def get_subscribed_loader(request):
+    """Подписан ли пользователь запроса на авторов: {author_id: bool}."""
+    user = request.user
+
+    def batch_load(author_ids):
+        if not user.is_authenticated:
+            return {}
+        return dict.fromkeys(
+            Subscription.objects.filter(
+                user=user,
+                author_id__in=author_ids,
+            ).values_list('author_id', flat=True),
+            True,
+        )
+
+    return get_loader(request, 'subscribed', batch_load, False)
+
+
+def get_recipe_flags_loader(request):
+    """Флаги избранного и корзины пользователя запроса по рецептам:
+    {recipe_id: RecipeFlags}. Рецепты страницы загружаются одним
+    запросом UNION по избранному и корзине."""
+    user = request.user
+
+    def batch_load(recipe_ids):
+        if not user.is_authenticated:
+            return {}
+        flags = {}
+        for recipe_id, kind in Favorite.objects.filter(
+            user=user,
+            recipe_id__in=recipe_ids,
+        ).order_by().values_list('recipe_id', Value('is_favorited')).union(
+            ShoppingCart.objects.filter(
+                user=user,
+                recipe_id__in=recipe_ids,
+            )
+            .order_by()
+            .values_list('recipe_id', Value('is_in_shopping_cart')),
+            all=True,
+        ):
+            flags[recipe_id] = flags.get(recipe_id, NO_FLAGS)._replace(
+                **{kind: True},
+            )
+        return flags
+
+    return get_loader(request, 'recipe_flags', batch_load, NO_FLAGS)
@@ -0,0 +1,293 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import random
+import subprocess
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, pct):
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    """Нагрузочный сценарий для API."""
+
+    help = (
+        'Прогоняет сценарий запросов к API внутри процесса и сохраняет '
+        'перцентили времени ответа и кол-ва SQL-запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Кол-во запросов на каждый сценарий.',
+        )
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Запустить только указанные сценарии.',
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+        parser.add_argument(
+            '--compare',
+            help='JSON-отчёт предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        """Запуск сценариев и формирование отчёта."""
+        self.random = random.Random(options['seed'])
+        self.prepare_data(options['users'])
+        scenarios = self.get_scenarios()
+        if options['scenario']:
+            unknown = set(options['scenario']) - set(scenarios)
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {unknown}')
+            scenarios = {
+                name: scenarios[name] for name in options['scenario']
+            }
+        report = {
+            'meta': self.get_meta(options),
+            'scenarios': {
+                name: self.run_scenario(
+                    build_request,
+                    options['requests'],
+                    options['concurrency'],
+                )
+                for name, build_request in scenarios.items()
+            },
+        }
+        self.print_report(report)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                self.print_comparison(json.load(file), report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f'Отчёт сохранён в {options["output"]}'),
+            )
+
+    def prepare_data(self, users_amount):
+        """Выборка идентификаторов и токенов, по которым строятся
+        запросы."""
+        self.recipe_ids = self.sample_ids(Recipe, 1000)
+        self.author_ids = sorted(
+            set(
+                Recipe.objects.filter(id__in=self.recipe_ids[:100])
+                .values_list('author_id', flat=True),
+            ),
+        )
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        self.ingredient_prefixes = sorted(
+            {
+                name[:2].lower()
+                for name in Ingredient.objects.values_list(
+                    'name',
+                    flat=True,
+                )[:500]
+            },
+        )
+        if not self.recipe_ids or not self.ingredient_prefixes:
+            raise CommandError(
+                'База данных пуста, запустите seed_benchmark.',
+            )
+        self.tokens = [
+            Token.objects.get_or_create(user=user)[0].key
+            for user in User.objects.filter(
+                id__in=self.sample_ids(User, users_amount),
+                is_active=True,
+            )
+        ]
+
+    def sample_ids(self, model, amount):
+        """Воспроизводимая при одинаковом --seed выборка
+        идентификаторов."""
+        bounds = model.objects.aggregate(Min('id'), Max('id'))
+        if bounds['id__min'] is None:
+            return []
+        candidates = {
+            self.random.randint(bounds['id__min'], bounds['id__max'])
+            for _ in range(amount * 2)
+        }
+        return sorted(
+            model.objects.filter(id__in=candidates).values_list(
+                'id',
+                flat=True,
+            ),
+        )[:amount]
+
+    def get_meta(self, options):
+        try:
+            commit = subprocess.run(
+                ('git', 'rev-parse', '--short', 'HEAD'),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+        }
+
+    def get_scenarios(self):
+        """Сценарии: имя -> функция, возвращающая (url, токен)."""
+        choice = self.random.choice
+        return {
+            'recipes_list': lambda: (
+                f'/api/recipes/?page={self.random.randint(1, 20)}&limit=6',
+                None,
+            ),
+            'recipes_list_auth': lambda: (
+                f'/api/recipes/?page={self.random.randint(1, 20)}&limit=6',
+                choice(self.tokens),
+            ),
+            'recipes_list_tags': lambda: (
+                f'/api/recipes/?tags={choice(self.tag_slugs)}'
+                f'&tags={choice(self.tag_slugs)}&limit=6',
+                None,
+            ),
+            'recipes_list_author': lambda: (
+                f'/api/recipes/?author={choice(self.author_ids)}&limit=6',
+                None,
+            ),
+            'recipes_favorited': lambda: (
+                '/api/recipes/?is_favorited=1&limit=6',
+                choice(self.tokens),
+            ),
+            'recipes_in_shopping_cart': lambda: (
+                '/api/recipes/?is_in_shopping_cart=1&limit=6',
+                choice(self.tokens),
+            ),
+            'recipe_detail': lambda: (
+                f'/api/recipes/{choice(self.recipe_ids)}/',
+                choice(self.tokens),
+            ),
+            'subscriptions': lambda: (
+                '/api/users/subscriptions/?recipes_limit=3',
+                choice(self.tokens),
+            ),
+            'download_shopping_cart': lambda: (
+                '/api/recipes/download_shopping_cart/',
+                choice(self.tokens),
+            ),
+            'ingredients_autocomplete': lambda: (
+                f'/api/ingredients/?name={choice(self.ingredient_prefixes)}',
+                None,
+            ),
+        }
+
+    def get_client(self):
+        host = settings.ALLOWED_HOSTS[0]
+        return Client(
+            HTTP_HOST='localhost' if host in ('*', '') else host.lstrip('.'),
+        )
+
+    def measure(self, client, url, token):
+        """Время ответа в мс, кол-во SQL-запросов и статус."""
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            response = client.get(url, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (perf_counter() - started) * 1000
+        return elapsed, len(queries), response.status_code
+
+    def run_worker(self, requests):
+        client = self.get_client()
+        try:
+            return [self.measure(client, *request) for request in requests]
+        finally:
+            connection.close()
+
+    def run_scenario(self, build_request, amount, concurrency):
+        requests = [build_request() for _ in range(amount)]
+        self.measure(self.get_client(), *requests[0])
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = [
+                    result
+                    for chunk in executor.map(
+                        self.run_worker,
+                        [requests[i::concurrency] for i in range(concurrency)],
+                    )
+                    for result in chunk
+                ]
+        else:
+            client = self.get_client()
+            results = [self.measure(client, *request) for request in requests]
+        timings = [elapsed for elapsed, _, _ in results]
+        queries = [count for _, count, _ in results]
+        stats = {
+            'requests': len(results),
+            'errors': sum(status >= 400 for _, _, status in results),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+        for pct in PERCENTILES:
+            stats[f'p{pct}_ms'] = round(percentile(timings, pct), 2)
+        return stats
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"сценарий":<28}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросы":>9}{"ошибки":>8}',
+        )
+        for name, stats in report['scenarios'].items():
+            self.stdout.write(
+                f'{name:<28}{stats["p50_ms"]:>9}{stats["p95_ms"]:>9}'
+                f'{stats["p99_ms"]:>9}{stats["queries_mean"]:>9}'
+                f'{stats["errors"]:>8}',
+            )
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write(
+            f'\nСравнение с {baseline["meta"].get("commit")} '
+            f'({baseline["meta"].get("date")}):',
+        )
+        for name, stats in report['scenarios'].items():
+            previous = baseline['scenarios'].get(name)
+            if previous is None:
+                continue
+            deltas = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean'):
+                change = stats[key] - previous[key]
+                percent = change / previous[key] * 100 if previous[key] else 0
+                deltas.append(f'{key} {change:+.2f} ({percent:+.1f}%)')
+            self.stdout.write(f'{name:<28}' + ', '.join(deltas))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.uploads import purge_uploads
+from recipes.media import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    """Сборка мусора в хранилище изображений."""
+
+    help = (
+        'Удаляет файлы изображений, на которые не ссылается ни один рецепт '
+        'или пользователь, и просроченные предварительные загрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.MEDIA_GC_GRACE,
+            help='Не удалять файлы, загруженные за последние N секунд.',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Пересчитать число ссылок на файлы по базе данных.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только вывести файлы, которые будут удалены.',
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(
+                f'Исправлено счётчиков ссылок: {recount_references()}',
+            )
+        names = collect_garbage(options['grace'], options['dry_run'])
+        if not options['dry_run']:
+            names += purge_uploads()
+        for name in names:
+            self.stdout.write(name)
+        message = (
+            'Будет удалено файлов' if options['dry_run'] else 'Удалено файлов'
+        )
+        self.stdout.write(self.style.SUCCESS(f'{message}: {len(names)}'))
@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from api.profiling import PROFILING_MODES, make_profiling_token
+
+
+class Command(BaseCommand):
+    """Выпуск подписанного значения заголовка профилирования."""
+
+    help = 'Выводит значение заголовка X-Profile для профилирования запроса.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=PROFILING_MODES,
+            default=PROFILING_MODES[0],
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_profiling_token(options['mode']))
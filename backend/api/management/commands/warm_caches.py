@@ -0,0 +1,62 @@
+from time import perf_counter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import BaseCommand, CommandError
+
+from api.warmup import get_warm_paths, warm_caches
+
+
+class Command(BaseCommand):
+    """Прогрев кэшей после деплоя."""
+
+    help = (
+        'Заполняет кэши ответами на самые частые анонимные запросы: '
+        'CACHE_WARM_PATHS и страницы популярных рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Пути вместо CACHE_WARM_PATHS и популярных рецептов.',
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            help='Кол-во популярных рецептов (CACHE_WARM_RECIPES).',
+        )
+        parser.add_argument(
+            '--base-url',
+            help=(
+                'Отправлять запросы по HTTP, например http://gateway, чтобы '
+                'прогреть и кэш nginx.'
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Кол-во параллельных запросов (CACHE_WARM_WORKERS).',
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        paths = options['paths'] or get_warm_paths(options['recipes'])
+        try:
+            results = warm_caches(
+                paths,
+                options['base_url'],
+                options['workers'],
+            )
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        failed = 0
+        for path, result, duration in results:
+            if result != 200:
+                failed += 1
+            self.stdout.write(f'{result} {duration * 1000:8.1f} мс  {path}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Прогрето путей: {len(results) - failed} из {len(results)} '
+                f'за {perf_counter() - started:.2f} с',
+            ),
+        )
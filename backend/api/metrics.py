@@ -0,0 +1,175 @@
+import os
+from time import perf_counter
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Count, Min
+from django.http import HttpResponse
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LABELS = ('view', 'method')
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'Время обработки запроса.',
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes',
+    'Размер тела ответа.',
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+REQUEST_QUERIES = Histogram(
+    'api_request_db_queries',
+    'Кол-во SQL-запросов на запрос.',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_TIME = Histogram(
+    'api_request_db_duration_seconds',
+    'Суммарное время SQL-запросов на запрос.',
+    LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+REQUEST_ERRORS = Counter(
+    'api_request_errors_total',
+    'Кол-во ответов с кодом ошибки.',
+    LABELS + ('status',),
+)
+CACHE_REQUESTS = Counter(
+    'app_cache_requests_total',
+    'Обращения к кэшам приложения.',
+    ('cache', 'result'),
+)
+
+TASKS = Counter(
+    'app_tasks_total',
+    'Выполнения фоновых задач по результату.',
+    ('task', 'result'),
+)
+TASK_DURATION = Histogram(
+    'app_task_duration_seconds',
+    'Время выполнения фоновой задачи.',
+    ('task',),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+
+def record_cache_access(cache, hit):
+    """Учитывает попадание или промах кэша."""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_task(task, result, duration):
+    """Учитывает выполнение фоновой задачи."""
+    TASKS.labels(task, result).inc()
+    TASK_DURATION.labels(task).observe(duration)
+
+
+class TaskQueueCollector:
+    """Размер очереди задач и возраст самой старой задачи по базе данных,
+    поэтому метрики не зависят от того, какой процесс их отдаёт."""
+
+    def collect(self):
+        Task = apps.get_model('tasks', 'Task')
+        size = GaugeMetricFamily(
+            'app_task_queue_size',
+            'Кол-во задач в очереди по состоянию.',
+            labels=('status',),
+        )
+        age = GaugeMetricFamily(
+            'app_task_queue_oldest_seconds',
+            'Время ожидания самой старой задачи в очереди.',
+        )
+        counts = dict.fromkeys(Task.Status.values, 0)
+        oldest = None
+        for status, count, run_at in (
+            Task.objects.order_by()
+            .values_list('status')
+            .annotate(Count('pk'), Min('run_at'))
+        ):
+            counts[status] = count
+            if status == Task.Status.PENDING:
+                oldest = run_at
+        for status, count in counts.items():
+            size.add_metric((status,), count)
+        age.add_metric(
+            (),
+            0 if oldest is None else max(
+                (timezone.now() - oldest).total_seconds(),
+                0,
+            ),
+        )
+        yield size
+        yield age
+
+
+def get_registry():
+    """Реестр метрик, агрегированный по процессам при
+    PROMETHEUS_MULTIPROC_DIR."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+class QueryStats:
+    """Обёртка выполнения SQL, считающая кол-во и время запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += perf_counter() - started
+
+
+def observe_request(request, response, duration, query_stats):
+    """Записывает метрики обработанного запроса."""
+    match = request.resolver_match
+    labels = (match.view_name if match else 'unresolved', request.method)
+    REQUEST_LATENCY.labels(*labels).observe(duration)
+    REQUEST_QUERIES.labels(*labels).observe(query_stats.count)
+    REQUEST_DB_TIME.labels(*labels).observe(query_stats.duration)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+    if response.status_code >= 400:
+        REQUEST_ERRORS.labels(*labels, response.status_code).inc()
+
+
+def measure_request(get_response, request):
+    """Выполняет запрос с замером времени и SQL-запросов."""
+    query_stats = QueryStats()
+    started = perf_counter()
+    with connection.execute_wrapper(query_stats):
+        response = get_response(request)
+    observe_request(request, response, perf_counter() - started, query_stats)
+    return response
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus, агрегированные по воркерам."""
+    queue = CollectorRegistry()
+    queue.register(TaskQueueCollector())
+    return HttpResponse(
+        generate_latest(get_registry()) + generate_latest(queue),
+        content_type=CONTENT_TYPE_LATEST,
+    )
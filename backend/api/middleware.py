@@ -0,0 +1,97 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from api.metrics import measure_request
+from api.profiling import RequestProfiler, get_profiling_mode
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RE_ACCEPTS_BR = re.compile(r'\bbr\b')
+RE_ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+UNCOMPRESSED_STREAMS = ('text/event-stream', 'application/gzip')
+
+API_CONTENT_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+)
+
+
+class MetricsMiddleware:
+    """Сбор метрик времени ответа, размера ответа и SQL-запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return measure_request(self.get_response, request)
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов по подписанному заголовку или с заданной
+    частотой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = get_profiling_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        profiler = RequestProfiler(mode)
+        response = profiler.run(self.get_response, request)
+        response['X-Profile-Id'] = profiler.save(request)
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Сжатие крупных ответов API в brotli или gzip по Accept-Encoding.
+
+    HTML-страницы (админ-зона, browsable API) содержат CSRF-токен,
+    поэтому сжимаются только GZipMiddleware со случайным дополнением
+    против BREACH.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(UNCOMPRESSED_STREAMS):
+            return response
+        if response.streaming or not content_type.startswith(
+            API_CONTENT_TYPES,
+        ):
+            return super().process_response(request, response)
+        if (
+            response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and RE_ACCEPTS_BR.search(accept_encoding):
+            encoding = 'br'
+            compressed = brotli.compress(
+                response.content,
+                quality=settings.BROTLI_QUALITY,
+            )
+        elif RE_ACCEPTS_GZIP.search(accept_encoding):
+            encoding = 'gzip'
+            compressed = compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^(W/)?', 'W/', response['ETag'], 1)
+        return response
@@ -0,0 +1,172 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import (
+    patch_cache_control,
+    patch_vary_headers,
+    parse_etags,
+)
+from rest_framework.exceptions import ValidationError
+
+from api.cache import make_etag
+from api.renderers import dumps
+
+SparseFields = namedtuple('SparseFields', ('fields', 'expand'))
+
+ALL_FIELDS = SparseFields(None, frozenset())
+
+
+def split_param(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def get_sparse_fields(request):
+    """Поля из параметров ?fields= и ?expand= запроса.
+
+    Без ?fields= возвращаются все поля со вложенными объектами. С ?fields=
+    возвращаются только перечисленные поля, а связанные объекты
+    сворачиваются до идентификаторов, если их нет в ?expand=. Параметры
+    учитываются только в GET-запросах.
+    """
+    sparse = getattr(request, 'sparse_fields', None)
+    if sparse is not None:
+        return sparse
+    if request.method != 'GET':
+        return ALL_FIELDS
+    fields = request.GET.get('fields')
+    expand = frozenset(split_param(request.GET.get('expand', '')))
+    sparse = SparseFields(
+        None if fields is None else frozenset(split_param(fields) | expand),
+        expand,
+    )
+    request.sparse_fields = sparse
+    return sparse
+
+
+class SparseFieldsMixin:
+    """Проверка параметров ?fields= и ?expand= во вьюсете."""
+
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_serializer_class(self):
+        return self.get_serializer_class()
+
+    def get_sparse_fields(self):
+        return get_sparse_fields(self.request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        sparse = self.get_sparse_fields()
+        if (
+            sparse.fields is None and not sparse.expand
+            or self.action not in self.sparse_actions
+        ):
+            return
+        serializer_class = self.get_sparse_serializer_class()
+        errors = {}
+        unknown = (sparse.fields or set()) - set(serializer_class.Meta.fields)
+        if unknown:
+            errors['fields'] = [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}.',
+            ]
+        unknown = sparse.expand - set(
+            getattr(serializer_class, 'collapsed_fields', {}),
+        )
+        if unknown:
+            errors['expand'] = [
+                f'Нельзя развернуть поля: {", ".join(sorted(unknown))}.',
+            ]
+        if errors:
+            raise ValidationError(errors)
+
+
+class PublicCacheMixin:
+    """Условные GET и заголовки кэширования для анонимных запросов.
+
+    ETag строится по поколениям данных public_cache_generations, поэтому
+    If-None-Match проверяется без обращения к базе данных. Ответы
+    разрешено кэшировать прокси на PUBLIC_CACHE_MAX_AGE секунд, после чего
+    nginx перепроверяет их запросом, который обычно завершается 304.
+    """
+
+    public_cache_actions = ('list', 'retrieve')
+    public_cache_generations = ()
+
+    def get_public_etag(self, request):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or 'HTTP_AUTHORIZATION' in request.META
+            or self.action_map.get(request.method.lower())
+            not in self.public_cache_actions
+        ):
+            return None
+        return make_etag(
+            self.public_cache_generations,
+            request.get_host(),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        etag = self.get_public_etag(request)
+        if etag is not None and any(
+            tag in ('*', etag, f'W/{etag}')
+            for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+        if etag is not None and response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.PUBLIC_CACHE_MAX_AGE,
+            )
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+
+def stream_json_list(items, render, chunk_size):
+    """JSON-массив из items частями по chunk_size элементов."""
+    chunk = [b'[']
+    for index, item in enumerate(items):
+        if index:
+            chunk.append(b',')
+        chunk.append(dumps(render(item)))
+        if len(chunk) >= 2 * chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+    chunk.append(b']')
+    yield b''.join(chunk)
+
+
+class StreamingListMixin:
+    """Потоковая отдача непостраничного списка в JSON.
+
+    Queryset читается через iterator() частями по streaming_chunk_size
+    строк и сериализуется построчно, поэтому память не зависит от
+    размера таблицы. Списки с пагинацией, другие форматы ответа и
+    подзапросы пакетного запроса отдаются как обычно.
+    """
+
+    streaming_chunk_size = settings.STREAMING_CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        if (
+            self.paginator is not None
+            or request.accepted_renderer.format != 'json'
+            or getattr(request, 'is_batch_subrequest', False)
+        ):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        return StreamingHttpResponse(
+            stream_json_list(
+                queryset.iterator(chunk_size=self.streaming_chunk_size),
+                serializer.to_representation,
+                self.streaming_chunk_size,
+            ),
+            content_type='application/json',
+        )
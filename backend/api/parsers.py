@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from api.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSON-парсер на orjson с откатом на стандартный json."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
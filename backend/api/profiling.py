@@ -0,0 +1,198 @@
+import cProfile
+from collections import Counter, defaultdict
+from datetime import datetime
+import json
+import os
+import random
+import sys
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.core import signing
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+PROFILING_SALT = 'api.profiling'
+PROFILING_MODES = ('sampling', 'cprofile')
+
+
+def make_profiling_token(mode='sampling'):
+    """Подписанное значение заголовка для профилирования запроса."""
+    return signing.TimestampSigner(salt=PROFILING_SALT).sign(mode)
+
+
+def get_profiling_mode(request):
+    """Режим профилирования запроса или None, если профилировать
+    не нужно."""
+    token = request.headers.get(settings.PROFILING_HEADER)
+    if token:
+        try:
+            mode = signing.TimestampSigner(salt=PROFILING_SALT).unsign(
+                token,
+                max_age=settings.PROFILING_TOKEN_MAX_AGE,
+            )
+        except signing.BadSignature:
+            return None
+        return mode if mode in PROFILING_MODES else None
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return settings.PROFILING_MODE
+    return None
+
+
+class StackSampler:
+    """Статистический профайлер: периодически снимает стек потока
+    запроса и считает свёрнутые стеки для flamegraph."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{frame.f_globals.get("__name__", "?")}:{code.co_name}',
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(f'{path}.folded', 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class RequestProfiler:
+    """Профилирование одного запроса и сохранение результатов."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.field_timings = defaultdict(lambda: [0, 0.0])
+
+    def run(self, get_response, request):
+        request.profiling_field_timings = self.field_timings
+        if self.mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            response = self.profiler.runcall(get_response, request)
+        else:
+            self.profiler = StackSampler(
+                threading.get_ident(),
+                settings.PROFILING_INTERVAL,
+            )
+            with self.profiler:
+                response = get_response(request)
+        return response
+
+    def save(self, request):
+        """Сохраняет профиль и тайминги полей сериализаторов,
+        возвращает имя файла без расширения."""
+        match = request.resolver_match
+        view_name = (match.view_name if match else 'unresolved').replace(
+            ':',
+            '_',
+        )
+        directory = os.path.join(settings.PROFILING_DIR, view_name)
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = os.path.join(directory, name)
+        if self.mode == 'cprofile':
+            self.profiler.dump_stats(f'{path}.prof')
+        else:
+            self.profiler.dump(path)
+        if self.field_timings:
+            with open(f'{path}.fields.json', 'w', encoding='utf-8') as file:
+                json.dump(
+                    {
+                        field: {'calls': calls, 'total_ms': round(total, 3)}
+                        for field, (calls, total) in sorted(
+                            self.field_timings.items(),
+                            key=lambda item: -item[1][1],
+                        )
+                    },
+                    file,
+                    indent=2,
+                )
+        prune_profiles(directory, settings.PROFILING_MAX_PROFILES)
+        return f'{view_name}/{name}'
+
+
+def prune_profiles(directory, keep):
+    """Удаляет файлы самых старых профилей каталога, оставляя keep
+    последних. При keep=0 профили не удаляются."""
+    files = defaultdict(list)
+    for entry in os.scandir(directory):
+        files[entry.name.split('.', 1)[0]].append(entry.path)
+    for name in sorted(files)[:-keep]:
+        for path in files[name]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def timed_plan(plan, timings, prefix):
+    """План вывода проекции, замеряющий время получения каждого
+    поля."""
+
+    def timed(getter, timing):
+        def wrapper(row, context):
+            started = perf_counter()
+            value = getter(row, context)
+            timing[0] += 1
+            timing[1] += (perf_counter() - started) * 1000
+            return value
+
+        return wrapper
+
+    return tuple(
+        (name, timed(getter, timings[f'{prefix}.{name}']))
+        for name, getter in plan
+    )
+
+
+class FieldTimingMixin:
+    """Замеряет время сериализации каждого поля, если запрос
+    профилируется."""
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        timings = getattr(request, 'profiling_field_timings', None)
+        if timings is None:
+            return super().to_representation(instance)
+        prefix = type(self).__name__
+        ret = {}
+        for field in self._readable_fields:
+            started = perf_counter()
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = (
+                attribute.pk
+                if isinstance(attribute, PKOnlyObject)
+                else attribute
+            )
+            if check_for_none is None:
+                ret[field.field_name] = None
+            else:
+                ret[field.field_name] = field.to_representation(attribute)
+            timing = timings[f'{prefix}.{field.field_name}']
+            timing[0] += 1
+            timing[1] += (perf_counter() - started) * 1000
+        return ret
@@ -0,0 +1,397 @@
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+
+from api.loaders import get_recipe_flags_loader, get_subscribed_loader
+from api.mixins import ALL_FIELDS, get_sparse_fields
+from api.profiling import timed_plan
+from api.serializers import (
+    RecipeGetSerializer,
+    SimpleRecipeSerializer,
+    UserGetSerializer,
+    UserSubscriptionSerializer,
+)
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+RECIPE_FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def column(name):
+    getter = itemgetter(name)
+    return lambda row, context: getter(row)
+
+
+def compile_plan(fields, getters, selected=None):
+    """План вывода: пары (поле, функция получения значения) в порядке
+    полей сериализатора."""
+    return tuple(
+        (name, getters.get(name) or column(name))
+        for name in fields
+        if selected is None or name in selected
+    )
+
+
+def render(plan, row, context):
+    return {name: getter(row, context) for name, getter in plan}
+
+
+def is_collapsed(name, sparse):
+    return sparse.fields is not None and name not in sparse.expand
+
+
+class ProjectionContext:
+    """Данные, общие для всех строк страницы."""
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self.sparse = get_sparse_fields(request)
+        self.scheme_host = request.build_absolute_uri('/')[:-1]
+        self.related = {}
+        self.timings = getattr(request, 'profiling_field_timings', None)
+
+    def get_plan(self, plan, owner):
+        """План вывода, при профилировании запроса — с замером времени
+        полей под именем owner."""
+        if self.timings is None:
+            return plan
+        return timed_plan(plan, self.timings, type(owner).__name__)
+
+    def media_url(self, name):
+        """URL файла как у ImageField.to_representation, без разбора
+        адреса для каждой строки."""
+        if not name:
+            return None
+        url = default_storage.url(name)
+        if url.startswith('/') and not url.startswith('//'):
+            return self.scheme_host + url
+        return self.request.build_absolute_uri(url)
+
+
+def image_variants(variants, context):
+    """Аналог ImageVariantsField.to_representation."""
+    if not variants:
+        return None
+    return {
+        size: {
+            extension: context.media_url(name)
+            for extension, name in formats.items()
+        }
+        for size, formats in variants.items()
+        if size != 'source'
+    }
+
+
+USER_GETTERS = {
+    'avatar': lambda row, context: context.media_url(row['avatar']),
+    'avatar_variants': lambda row, context: image_variants(
+        row['avatar_variants'],
+        context,
+    ),
+    'is_subscribed': lambda row, context: (
+        row['id'] in context.related['subscribed']
+    ),
+}
+USER_COLUMNS = tuple(
+    name for name in UserGetSerializer.Meta.fields if name != 'is_subscribed'
+)
+
+SIMPLE_RECIPE_PLAN = compile_plan(
+    SimpleRecipeSerializer.Meta.fields,
+    {
+        'image': lambda row, context: context.media_url(row['image']),
+        'image_variants': lambda row, context: image_variants(
+            row['image_variants'],
+            context,
+        ),
+    },
+)
+
+SUBSCRIPTION_GETTERS = dict(
+    USER_GETTERS,
+    recipes=lambda row, context: [
+        render(SIMPLE_RECIPE_PLAN, recipe, context)
+        for recipe in context.related['recipes'][row['id']]
+    ],
+)
+SUBSCRIPTION_COLLAPSED_GETTERS = {
+    'recipes': lambda row, context: [
+        recipe['id'] for recipe in context.related['recipes'][row['id']]
+    ],
+}
+
+RECIPE_GETTERS = {
+    'tags': lambda row, context: context.related['tags'][row['id']],
+    'author': lambda row, context: context.related['authors'][
+        row['author_id']
+    ],
+    'ingredients': lambda row, context: context.related['ingredients'][
+        row['id']
+    ],
+    'is_favorited': lambda row, context: context.related['flags'][
+        row['id']
+    ].is_favorited,
+    'is_in_shopping_cart': lambda row, context: context.related['flags'][
+        row['id']
+    ].is_in_shopping_cart,
+    'image': lambda row, context: context.media_url(row['image']),
+    'image_variants': lambda row, context: image_variants(
+        row['image_variants'],
+        context,
+    ),
+}
+RECIPE_COLLAPSED_GETTERS = {
+    'author': lambda row, context: row['author_id'],
+    'tags': RECIPE_GETTERS['tags'],
+    'ingredients': RECIPE_GETTERS['ingredients'],
+}
+RECIPE_COLUMNS = {
+    'id': 'id',
+    'author': 'author_id',
+    'name': 'name',
+    'image': 'image',
+    'image_variants': 'image_variants',
+    'text': 'text',
+    'cooking_time': 'cooking_time',
+}
+
+
+@lru_cache(maxsize=None)
+def get_plan(fields, getters, collapsed_getters, sparse):
+    """План вывода с учётом ?fields= и ?expand=."""
+    getters = dict(getters)
+    getters.update(
+        (name, getter)
+        for name, getter in collapsed_getters
+        if is_collapsed(name, sparse)
+    )
+    return compile_plan(fields, getters, sparse.fields)
+
+
+def load_subscribed(context, author_ids):
+    """Авторы из author_ids, на которых подписан пользователь запроса."""
+    return {
+        author_id
+        for author_id, subscribed in get_subscribed_loader(context.request)
+        .load_many(author_ids)
+        .items()
+        if subscribed
+    }
+
+
+def recipe_values(queryset, sparse):
+    """Страница рецептов в виде values() для RecipeProjection."""
+    columns = {'id', 'author_id'} if sparse.fields is None else {'id'}
+    columns.update(
+        column
+        for name, column in RECIPE_COLUMNS.items()
+        if sparse.fields is None or name in sparse.fields
+    )
+    return queryset.select_related(None).prefetch_related(None).values(
+        *columns,
+    )
+
+
+def user_values(queryset, sparse):
+    """Страница пользователей в виде values() для UserProjection."""
+    return queryset.prefetch_related(None).values(
+        *(
+            name
+            for name in USER_COLUMNS
+            if name == 'id' or sparse.fields is None or name in sparse.fields
+        ),
+    )
+
+
+def subscription_values(queryset, sparse):
+    """Страница подписок в виде values() для SubscriptionProjection."""
+    columns = user_values(queryset, sparse).query.values_select
+    if sparse.fields is None or 'recipes_count' in sparse.fields:
+        columns += ('recipes_count',)
+    return queryset.prefetch_related(None).values(*columns)
+
+
+class UserProjection:
+    """Аналог UserGetSerializer(many=True) на основе values()."""
+
+    fields = UserGetSerializer.Meta.fields
+    getters = USER_GETTERS
+    collapsed_getters = {}
+
+    def __init__(self, request, context=None, nested=False):
+        self.context = context or ProjectionContext(request)
+        self.sparse = ALL_FIELDS if nested else self.context.sparse
+        self.plan = self.context.get_plan(
+            get_plan(
+                self.fields,
+                tuple(self.getters.items()),
+                tuple(self.collapsed_getters.items()),
+                self.sparse,
+            ),
+            self,
+        )
+
+    def requested(self, name):
+        return self.sparse.fields is None or name in self.sparse.fields
+
+    def load_related(self, rows):
+        if self.requested('is_subscribed'):
+            self.context.related['subscribed'] = load_subscribed(
+                self.context,
+                [row['id'] for row in rows],
+            )
+
+    def render(self, rows):
+        rows = list(rows)
+        self.load_related(rows)
+        return [render(self.plan, row, self.context) for row in rows]
+
+
+class SubscriptionProjection(UserProjection):
+    """Аналог UserSubscriptionSerializer(many=True) на основе values()."""
+
+    fields = UserSubscriptionSerializer.Meta.fields
+    getters = SUBSCRIPTION_GETTERS
+    collapsed_getters = SUBSCRIPTION_COLLAPSED_GETTERS
+
+    def load_related(self, rows):
+        super().load_related(rows)
+        if not self.requested('recipes'):
+            return
+        recipes = Recipe.objects.filter(
+            author_id__in=[row['id'] for row in rows],
+        )
+        recipes_limit = self.context.request.query_params.get(
+            'recipes_limit',
+        )
+        if recipes_limit:
+            try:
+                recipes_limit = int(recipes_limit)
+                if recipes_limit < 0:
+                    raise ValueError
+            except ValueError:
+                raise serializers.ValidationError('Лимит должен быть числом!')
+            recipes = recipes.annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=F('pub_date').desc(),
+                ),
+            ).filter(position__lte=recipes_limit)
+        columns = (
+            ('id',)
+            if is_collapsed('recipes', self.sparse)
+            else SimpleRecipeSerializer.Meta.fields
+        )
+        related = defaultdict(list)
+        for recipe in recipes.values('author_id', *columns):
+            related[recipe['author_id']].append(recipe)
+        self.context.related['recipes'] = related
+
+
+class RecipeProjection:
+    """Аналог RecipeGetSerializer(many=True) на основе values().
+
+    Связанные теги, ингредиенты и авторы загружаются одним запросом на
+    страницу каждый и только если они попали в ?fields=.
+    """
+
+    fields = RecipeGetSerializer.Meta.fields
+
+    def __init__(self, request):
+        self.context = ProjectionContext(request)
+        self.sparse = self.context.sparse
+        self.plan = self.context.get_plan(
+            get_plan(
+                self.fields,
+                tuple(RECIPE_GETTERS.items()),
+                tuple(RECIPE_COLLAPSED_GETTERS.items()),
+                self.sparse,
+            ),
+            self,
+        )
+
+    def requested(self, name):
+        return self.sparse.fields is None or name in self.sparse.fields
+
+    def load_tags(self, recipe_ids):
+        collapsed = is_collapsed('tags', self.sparse)
+        tags = defaultdict(list)
+        for recipe_id, *tag in (
+            Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+            .order_by('tag__name')
+            .values_list('recipe_id', 'tag__id', 'tag__name', 'tag__slug')
+        ):
+            if collapsed:
+                tags[recipe_id].append(tag[0])
+            else:
+                tags[recipe_id].append(dict(zip(('id', 'name', 'slug'), tag)))
+        return tags
+
+    def load_ingredients(self, recipe_ids):
+        queryset = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids,
+        ).order_by('ingredient__name')
+        if is_collapsed('ingredients', self.sparse):
+            keys = ('id', 'amount')
+            queryset = queryset.values_list(
+                'recipe_id',
+                'ingredient_id',
+                'amount',
+            )
+        else:
+            keys = ('id', 'name', 'measurement_unit', 'amount')
+            queryset = queryset.values_list(
+                'recipe_id',
+                'ingredient__id',
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'amount',
+            )
+        ingredients = defaultdict(list)
+        for recipe_id, *ingredient in queryset:
+            ingredients[recipe_id].append(dict(zip(keys, ingredient)))
+        return ingredients
+
+    def load_authors(self, author_ids):
+        return {
+            author['id']: author
+            for author in UserProjection(
+                self.context.request,
+                self.context,
+                nested=True,
+            ).render(
+                User.objects.filter(pk__in=author_ids)
+                .order_by()
+                .values(*USER_COLUMNS),
+            )
+        }
+
+    def render(self, rows):
+        rows = list(rows)
+        recipe_ids = [row['id'] for row in rows]
+        related = self.context.related
+        if self.requested('tags'):
+            related['tags'] = self.load_tags(recipe_ids)
+        if self.requested('ingredients'):
+            related['ingredients'] = self.load_ingredients(recipe_ids)
+        if any(self.requested(name) for name in RECIPE_FLAGS):
+            related['flags'] = get_recipe_flags_loader(
+                self.context.request,
+            ).load_many(recipe_ids)
+        if self.requested('author') and not is_collapsed(
+            'author',
+            self.sparse,
+        ):
+            related['authors'] = self.load_authors(
+                {row['author_id'] for row in rows},
+            )
+        return [render(self.plan, row, self.context) for row in rows]
@@ -0,0 +1,45 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def default(obj):
+    """Типы DRF, которые orjson не сериализует сам: даты в формате DRF,
+    QuerySet, ленивые строки, Decimal и т.д."""
+    return JSONEncoder().default(obj)
+
+
+def dumps(data):
+    """Сериализация в JSON-байты через orjson или стандартный json."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    return (
+        orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+        .replace(b'\xe2\x80\xa8', b'\\u2028')
+        .replace(b'\xe2\x80\xa9', b'\\u2029')
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с откатом на стандартный json."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data,
+                accepted_media_type,
+                renderer_context,
+            )
+        if data is None:
+            return b''
+        return dumps(data)
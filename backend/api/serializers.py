@@ -1,9 +1,23 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db.models import F
+from django.urls import Resolver404, resolve, reverse
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from api.batch import is_batch_allowed
+from api.loaders import (
+    get_recipe_flags_loader,
+    get_subscribed_loader,
+    NO_FLAGS,
+)
+from api.mixins import get_sparse_fields
+from api.profiling import FieldTimingMixin
+from api.uploads import UploadImageField
 from recipes.constants import MAX_INGREDIENTS_AMOUNT, MIN_INGREDIENTS_AMOUNT
 from recipes.models import (
     Favorite,
@@ -13,30 +27,91 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.tasks import update_recipe_indexes
 from users.models import Subscription
 
 User = get_user_model()
 
 
-class UserGetSerializer(UserSerializer):
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URL уменьшенных копий изображения по размерам и форматам или None,
+    пока копии не готовы."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        return {
+            size: {
+                extension: self.get_url(request, name)
+                for extension, name in formats.items()
+            }
+            for size, formats in value.items()
+            if size != 'source'
+        }
+
+    @staticmethod
+    def get_url(request, name):
+        url = default_storage.url(name)
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+
+class SparseFieldsSerializerMixin:
+    """Отбор полей по ?fields= и сворачивание связей, не указанных в
+    ?expand=, для корневого сериализатора запроса."""
+
+    collapsed_fields = {}
+
+    def is_root_serializer(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self.is_root_serializer():
+            return fields
+        sparse = get_sparse_fields(request)
+        if sparse.fields is None:
+            return fields
+        fields = {
+            name: field
+            for name, field in fields.items()
+            if name in sparse.fields
+        }
+        for name, make_field in self.collapsed_fields.items():
+            if name in fields and name not in sparse.expand:
+                fields[name] = make_field()
+        return fields
+
+
+class UserGetSerializer(
+    SparseFieldsSerializerMixin,
+    FieldTimingMixin,
+    UserSerializer,
+):
     """Сериализатор для получения информации о пользователях."""
 
-    avatar = Base64ImageField(required=False, allow_null=True)
+    avatar = UploadImageField(required=False, allow_null=True)
+    avatar_variants = ImageVariantsField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
         model = User
         fields = UserSerializer.Meta.fields + (
             'avatar',
+            'avatar_variants',
             'is_subscribed',
         )
 
     def get_is_subscribed(self, obj):
         """Метод определяет статус подписки на автора."""
-        user = self.context.get('request').user
-        return (
-            obj.subscriptions_to_author.filter(user=user.id).exists()
-            and user.is_authenticated
+        return get_subscribed_loader(self.context.get('request')).load(
+            obj.id,
         )
 
 
@@ -44,6 +119,7 @@ class SimpleRecipeSerializer(serializers.ModelSerializer):
     """Простой сериализатор для отображения рецептов."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -51,6 +127,7 @@ class SimpleRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
@@ -62,14 +139,19 @@ class UserSubscriptionSerializer(UserGetSerializer):
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(default=0)
 
+    collapsed_fields = {
+        'recipes': lambda: serializers.SerializerMethodField(
+            method_name='get_recipe_ids',
+        ),
+    }
+
     class Meta(UserGetSerializer.Meta):
         fields = UserGetSerializer.Meta.fields + (
             'recipes',
             'recipes_count',
         )
 
-    def get_recipes(self, obj):
-        """Получение рецептов автора."""
+    def get_limited_recipes(self, obj):
         request = self.context['request']
         recipes = obj.recipes.all()
         recipes_limit = request.query_params.get('recipes_limit')
@@ -78,8 +160,16 @@ class UserSubscriptionSerializer(UserGetSerializer):
                 recipes = recipes[: int(recipes_limit)]
             except ValueError:
                 raise serializers.ValidationError('Лимит должен быть числом!')
+        return recipes
+
+    def get_recipe_ids(self, obj):
+        """Идентификаторы рецептов автора."""
+        return [recipe.id for recipe in self.get_limited_recipes(obj)]
+
+    def get_recipes(self, obj):
+        """Получение рецептов автора."""
         return SimpleRecipeSerializer(
-            recipes,
+            self.get_limited_recipes(obj),
             many=True,
             read_only=True,
             context=self.context,
@@ -125,18 +215,52 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class RecipeGetSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """Список рецептов с загрузкой флагов избранного и корзины одним
+    запросом на всю страницу."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request is not None and {
+            'is_favorited',
+            'is_in_shopping_cart',
+        } & set(self.child.fields):
+            get_recipe_flags_loader(request).load_many(
+                recipe.id for recipe in recipes
+            )
+        return super().to_representation(recipes)
+
+
+class RecipeGetSerializer(
+    SparseFieldsSerializerMixin,
+    FieldTimingMixin,
+    serializers.ModelSerializer,
+):
     """Сериализатор для получения рецептов."""
 
     author = UserGetSerializer()
     tags = TagSerializer(many=True)
     ingredients = serializers.SerializerMethodField()
-    is_favorited = serializers.BooleanField(default=0)
-    is_in_shopping_cart = serializers.BooleanField(default=0)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
+
+    collapsed_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True,
+            read_only=True,
+        ),
+        'ingredients': lambda: serializers.SerializerMethodField(
+            method_name='get_ingredient_amounts',
+        ),
+    }
 
     class Meta:
         model = Recipe
+        list_serializer_class = RecipeListSerializer
         fields = (
             'id',
             'tags',
@@ -146,10 +270,25 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
+    def get_flags(self, obj):
+        request = self.context.get('request')
+        if request is None:
+            return NO_FLAGS
+        return get_recipe_flags_loader(request).load(obj.id)
+
+    def get_is_favorited(self, obj):
+        """Метод определяет, добавлен ли рецепт в избранное."""
+        return self.get_flags(obj).is_favorited
+
+    def get_is_in_shopping_cart(self, obj):
+        """Метод определяет, добавлен ли рецепт в корзину."""
+        return self.get_flags(obj).is_in_shopping_cart
+
     def get_ingredients(self, obj):
         """Возвращает список ингредиентов рецепта с их количеством."""
         return obj.ingredients.values(
@@ -159,6 +298,13 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             amount=F('recipe_ingredients__amount'),
         )
 
+    def get_ingredient_amounts(self, obj):
+        """Возвращает идентификаторы ингредиентов рецепта с количеством."""
+        return [
+            {'id': ingredient.ingredient_id, 'amount': ingredient.amount}
+            for ingredient in obj.recipe_ingredients.all()
+        ]
+
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиентов в рецепте."""
@@ -187,7 +333,7 @@ class RecipePostSerializer(serializers.ModelSerializer):
         slug_field='username',
         read_only=True,
     )
-    image = Base64ImageField(required=True)
+    image = UploadImageField(required=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
@@ -221,6 +367,7 @@ class RecipePostSerializer(serializers.ModelSerializer):
                 for ingredient in ingredients_list
             ],
         )
+        update_recipe_indexes.delay(instance.id)
 
     def create(self, validated_data):
         tags_list = validated_data.pop('tags')
@@ -297,3 +444,42 @@ class ShoppingCartSerializer(RecipeFavoriteCartSerializer):
 
     class Meta(RecipeFavoriteCartSerializer.Meta):
         model = ShoppingCart
+
+
+class ImageUploadSerializer(serializers.Serializer):
+    """Сериализатор предварительной загрузки изображения."""
+
+    image = serializers.ImageField(write_only=True)
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Подзапрос пакетного запроса."""
+
+    id = serializers.CharField(required=False, max_length=64)
+    path = serializers.CharField(max_length=2048)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/') or path == reverse('batch'):
+            raise serializers.ValidationError(
+                'Допустимы только пути API, кроме пакетного запроса.',
+            )
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return value
+        if not is_batch_allowed(match):
+            raise serializers.ValidationError(
+                'Потоковые ответы недоступны в пакетном запросе.',
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Сериализатор пакетного запроса."""
+
+    requests = BatchItemSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS,
+    )
@@ -0,0 +1,188 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_user_tokens
+from api.cache import bump_generation
+from api.events import publish
+from api.tasks import schedule_warmup
+from recipes.changelog import deleted_with_user, record_change
+from recipes.media import (
+    change_refcount,
+    MEDIA_FIELDS,
+    stored_media,
+    update_references,
+)
+from recipes.models import (
+    ChangeLog,
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeRanking,
+    ShoppingCart,
+    Tag,
+)
+from recipes.pantry import remove_from_pantry_index
+from recipes.similarity import remove_from_similar_index
+from recipes.tasks import schedule_image_processing
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Сбрасывает кэш при выходе из системы и удалении токена."""
+    transaction.on_commit(lambda: invalidate_user_tokens(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    """Сбрасывает кэш при изменении, деактивации и удалении
+    пользователя."""
+    transaction.on_commit(lambda: invalidate_user_tokens(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_indexes(sender, instance, **kwargs):
+    """Исключает удалённый рецепт из индексов подбора по продуктам и
+    похожих рецептов."""
+
+    def remove():
+        remove_from_pantry_index(instance.pk)
+        remove_from_similar_index(instance.pk)
+
+    transaction.on_commit(remove)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_ranking(sender, instance, created, **kwargs):
+    """Создаёт нулевой рейтинг нового рецепта, чтобы он сразу попадал
+    в сортировку по популярности."""
+    if created:
+        RecipeRanking.objects.get_or_create(recipe=instance)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes(sender, **kwargs):
+    """Сбрасывает кэши, построенные на рецептах и тегах, и планирует их
+    прогрев."""
+    transaction.on_commit(lambda: bump_generation('recipes'))
+    transaction.on_commit(schedule_warmup)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Сбрасывает кэши списка ингредиентов."""
+    transaction.on_commit(lambda: bump_generation('ingredients'))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_user_recipes(sender, instance, **kwargs):
+    """Сбрасывает кэш списков рецептов с фильтром по избранному или
+    корзине пользователя."""
+    name = f'{sender._meta.model_name}:{instance.user_id}'
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+def log_added(sender, instance, created, **kwargs):
+    """Записывает добавление в журнал изменений для синхронизации."""
+    if created:
+        record_change(instance, added=True)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def log_removed(sender, instance, origin=None, **kwargs):
+    """Записывает удаление в журнал изменений для синхронизации."""
+    if not deleted_with_user(instance, origin):
+        record_change(instance, added=False)
+
+
+@receiver(post_save, sender=ChangeLog)
+def publish_change(sender, instance, created, **kwargs):
+    """Отправляет изменение избранного, корзины или подписок на другие
+    устройства пользователя."""
+    if created:
+        publish(
+            {
+                'type': instance.kind,
+                'user': instance.user_id,
+                'id': instance.object_id,
+                'added': instance.added,
+            },
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def publish_recipe(sender, instance, created, **kwargs):
+    """Отправляет новый рецепт подписчикам автора."""
+    if created:
+        publish(
+            {
+                'type': 'recipe',
+                'author': instance.author_id,
+                'id': instance.id,
+            },
+        )
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_users(sender, update_fields=None, **kwargs):
+    """Сбрасывает кэши, содержащие данные авторов, кроме обновления
+    даты последнего входа."""
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        transaction.on_commit(lambda: bump_generation('users'))
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    """Ставит в очередь построение уменьшенных копий нового фото."""
+    schedule_image_processing(instance, 'image')
+
+
+@receiver(post_save, sender=User)
+def process_avatar(sender, instance, **kwargs):
+    """Ставит в очередь построение уменьшенных копий нового аватара."""
+    schedule_image_processing(instance, 'avatar')
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=User)
+def remember_media(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежний файл изображения для подсчёта ссылок."""
+    if update_fields is None or MEDIA_FIELDS[sender] in update_fields:
+        instance._stored_media = stored_media(instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def count_media_references(sender, instance, **kwargs):
+    """Переносит ссылку с прежнего файла изображения на новый."""
+    old = instance.__dict__.pop('_stored_media', None)
+    if old is not None:
+        update_references(
+            old,
+            getattr(instance, MEDIA_FIELDS[sender]).name or '',
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=User)
+def release_media(sender, instance, **kwargs):
+    """Освобождает файл изображения удалённого объекта."""
+    change_refcount(getattr(instance, MEDIA_FIELDS[sender]).name, -1)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from api.warmup import warm_caches
+from tasks.queue import task
+
+WARMUP_SCHEDULED_KEY = 'warmup:scheduled'
+
+
+@task(max_attempts=1)
+def warm_caches_task():
+    """Прогрев кэшей после их сброса."""
+    warm_caches()
+
+
+def schedule_warmup():
+    """Отложенный прогрев после сброса кэшей: одна задача на
+    CACHE_WARM_DELAY секунд, сколько бы изменений ни было."""
+    if settings.CACHE_WARM_DELAY and cache.add(
+        WARMUP_SCHEDULED_KEY,
+        True,
+        settings.CACHE_WARM_DELAY,
+    ):
+        warm_caches_task.schedule(settings.CACHE_WARM_DELAY)
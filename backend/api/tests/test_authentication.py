@@ -0,0 +1,108 @@
+import pickle
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.authentication import (
+    TOKEN_KEY,
+    CachedTokenAuthentication,
+    invalidate_user_tokens,
+    token_cache,
+)
+from users.models import User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Кэш токенов с общим для процессов файловым кэшем."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.TemporaryDirectory()
+        cls.enterClassContext(
+            override_settings(
+                CACHES={
+                    'default': {
+                        'BACKEND': (
+                            'django.core.cache.backends.locmem.LocMemCache'
+                        ),
+                    },
+                    'tokens': {
+                        'BACKEND': (
+                            'django.core.cache.backends.filebased.'
+                            'FileBasedCache'
+                        ),
+                        'LOCATION': cls.cache_dir.name,
+                    },
+                },
+                TOKEN_AUTH_SHARED_CACHE='tokens',
+            ),
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.cache_dir.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+            avatar='avatars/user.jpg',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        caches['tokens'].clear()
+        token_cache.clear()
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.authentication.authenticate_credentials(self.token.key)
+
+    def test_cached(self):
+        self.authenticate()
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, 'user@example.com')
+        self.assertEqual(user.avatar.name, 'avatars/user.jpg')
+        self.assertEqual(token.key, self.token.key)
+
+    def test_password_not_cached(self):
+        self.authenticate()
+        data = caches['tokens'].get(TOKEN_KEY.format(self.token.key))
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(data))
+        token_cache.clear()
+        user, _ = self.authenticate()
+        user.first_name = 'Другое'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('password'))
+
+    def test_invalidation_during_lookup(self):
+        authenticate_credentials = TokenAuthentication.authenticate_credentials
+
+        def invalidate_during_lookup(authentication, key):
+            credentials = authenticate_credentials(authentication, key)
+            invalidate_user_tokens(self.user.pk)
+            return credentials
+
+        with mock.patch.object(
+            TokenAuthentication,
+            'authenticate_credentials',
+            invalidate_during_lookup,
+        ):
+            self.authenticate()
+        token_cache.clear()
+        with self.assertNumQueries(1):
+            self.authenticate()
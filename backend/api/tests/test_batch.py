@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from api.views import RecipeViewSet
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import User
+
+
+class BatchTests(TestCase):
+    """Пакетный запрос /api/batch/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(
+            name='Мука',
+            measurement_unit='г',
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name='Блины',
+            text='Описание',
+            cooking_time=20,
+            image='media/recipe.jpg',
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe,
+            ingredient=cls.ingredient,
+            amount=200,
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipe)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def batch(self, *paths):
+        return self.client.post(
+            '/api/batch/',
+            {'requests': [{'path': path} for path in paths]},
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+    def test_responses(self):
+        response = self.batch(
+            f'/api/recipes/{self.recipe.id}/',
+            '/api/users/me/',
+            '/api/recipes/999999/',
+            '/api/nothing/',
+        )
+        self.assertEqual(response.status_code, 200)
+        responses = response.json()['responses']
+        self.assertEqual(
+            [item['status'] for item in responses],
+            [200, 200, 404, 404],
+        )
+        self.assertEqual(responses[0]['body']['name'], 'Блины')
+        self.assertEqual(responses[1]['body']['username'], 'user')
+
+    def test_streamed_lists(self):
+        response = self.batch('/api/tags/', '/api/ingredients/?name=Му')
+        self.assertEqual(response.status_code, 200)
+        tags, ingredients = response.json()['responses']
+        self.assertEqual(
+            tags,
+            {
+                'id': 0,
+                'status': 200,
+                'body': [
+                    {'id': self.tag.id, 'name': 'Завтрак', 'slug': 'breakfast'},
+                ],
+            },
+        )
+        self.assertEqual(
+            ingredients['body'],
+            [
+                {
+                    'id': self.ingredient.id,
+                    'name': 'Мука',
+                    'measurement_unit': 'г',
+                },
+            ],
+        )
+        self.assertTrue(self.client.get('/api/tags/').streaming)
+
+    def test_file_response(self):
+        response = self.batch('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        item = response.json()['responses'][0]
+        self.assertEqual(item['status'], 200)
+        self.assertIn('Мука - 200 г', item['body'])
+
+    def test_subrequest_error_does_not_fail_batch(self):
+        with mock.patch.object(
+            RecipeViewSet,
+            'retrieve',
+            side_effect=RuntimeError,
+        ), self.assertLogs('api.batch', 'ERROR'):
+            response = self.batch(
+                f'/api/recipes/{self.recipe.id}/',
+                '/api/users/me/',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['status'] for item in response.json()['responses']],
+            [500, 200],
+        )
+
+    def test_streaming_views_rejected(self):
+        response = self.batch('/api/users/me/', '/api/events/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['requests'][1]['path'],
+            ['Потоковые ответы недоступны в пакетном запросе.'],
+        )
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Recipe, RecipeRanking, Tag
+from users.models import User
+
+
+class FacetsTests(TestCase):
+    """Кол-во рецептов в /api/recipes/facets/ не зависит от сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=index + 1,
+                image=f'media/recipe{index}.jpg',
+            )
+            recipe.tags.add(cls.tag)
+        # Рецепт без рейтинга, например созданный bulk_create.
+        RecipeRanking.objects.filter(recipe=recipe).delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_count(self, query):
+        response = self.client.get('/api/recipes/facets/', query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count']
+
+    def test_ordering_ignored(self):
+        self.assertEqual(self.get_count({'ordering': 'popular'}), 3)
+        self.assertEqual(self.get_count({}), 3)
+        self.assertEqual(
+            self.get_count({'ordering': 'trending', 'tags': 'breakfast'}),
+            3,
+        )
+
+    def test_invalid_filter(self):
+        response = self.client.get('/api/recipes/facets/', {'tags': 'x'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,102 @@
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.pantry import rebuild_pantry_index
+from users.models import User
+
+
+class PantryTests(TestCase):
+    """Подбор рецептов по продуктам."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.index_dir = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(INDEX_DIR=cls.index_dir.name))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.index_dir.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Мука', 'Сахар', 'Соль')
+        ]
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=1,
+                image=f'media/recipe{index}.jpg',
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+                for ingredient in cls.ingredients[:index + 1]
+            )
+
+    def setUp(self):
+        cache.clear()
+        rebuild_pantry_index()
+
+    def get_pantry(self, **query):
+        response = self.client.get(
+            '/api/recipes/pantry/',
+            {'ingredients': self.ingredients[0].id, **query},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_missing_ingredients(self):
+        self.assertEqual(
+            self.get_pantry(fields='name'),
+            [
+                {'name': 'Рецепт 0', 'missing_ingredients': 0},
+                {'name': 'Рецепт 1', 'missing_ingredients': 1},
+                {'name': 'Рецепт 2', 'missing_ingredients': 2},
+            ],
+        )
+
+    def check_recipe_deleted_before_render(self):
+        render_recipes_by_id = RecipeViewSet.render_recipes_by_id
+
+        def delete_and_render(view, recipes):
+            Recipe.objects.filter(name='Рецепт 0').delete()
+            return render_recipes_by_id(view, recipes)
+
+        with mock.patch.object(
+            RecipeViewSet,
+            'render_recipes_by_id',
+            delete_and_render,
+        ):
+            results = self.get_pantry(fields='name')
+        self.assertEqual(
+            results,
+            [
+                {'name': 'Рецепт 1', 'missing_ingredients': 1},
+                {'name': 'Рецепт 2', 'missing_ingredients': 2},
+            ],
+        )
+
+    @override_settings(FAST_READ_SERIALIZERS=False)
+    def test_recipe_deleted_before_render(self):
+        self.check_recipe_deleted_before_render()
+
+    @override_settings(FAST_READ_SERIALIZERS=True)
+    def test_recipe_deleted_before_render_fast(self):
+        self.check_recipe_deleted_before_render()
@@ -0,0 +1,170 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+RECIPE_QUERIES = (
+    {},
+    {'limit': 3, 'page': 2},
+    {'fields': 'id,name,author,tags,ingredients,is_favorited'},
+    {'fields': 'id,image,is_in_shopping_cart', 'expand': 'author,tags'},
+    {'fields': 'cooking_time', 'expand': 'ingredients'},
+    {'expand': 'author'},
+)
+USER_QUERIES = (
+    {},
+    {'limit': 2, 'page': 2},
+    {'fields': 'id,username,is_subscribed'},
+    {'fields': 'avatar,avatar_variants'},
+)
+SUBSCRIPTION_QUERIES = (
+    {},
+    {'recipes_limit': 2},
+    {'fields': 'id,recipes,recipes_count'},
+    {'fields': 'id,recipes', 'recipes_limit': 1},
+    {'fields': 'email', 'expand': 'recipes'},
+)
+
+
+def image_variants(name):
+    return {
+        'source': f'{name}.jpg',
+        'small': {'jpeg': f'{name}-small.jpg', 'webp': f'{name}-small.webp'},
+    }
+
+
+class ProjectionOutputTests(TestCase):
+    """Вывод списков через values()-проекции совпадает побайтно
+    с выводом сериализаторов DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{index}',
+                email=f'user{index}@example.com',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+                password='password',
+                avatar=f'avatars/avatar{index}.jpg' if index % 2 else None,
+                avatar_variants=(
+                    image_variants(f'avatars/avatar{index}')
+                    if index == 1
+                    else {}
+                ),
+            )
+            for index in range(4)
+        ]
+        tags = [
+            Tag.objects.create(name=name, slug=slug)
+            for name, slug in (
+                ('Завтрак', 'breakfast'),
+                ('Обед', 'lunch'),
+                ('Ужин', 'dinner'),
+            )
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}',
+                measurement_unit='г',
+            )
+            for index in range(5)
+        ]
+        cls.recipes = []
+        for index in range(9):
+            recipe = Recipe.objects.create(
+                author=cls.users[index % 3],
+                name=f'Рецепт {index}',
+                text=f'Описание {index}',
+                cooking_time=index + 1,
+                image=f'media/recipe{index}.jpg',
+                image_variants=(
+                    image_variants(f'media/recipe{index}')
+                    if index % 2
+                    else {}
+                ),
+            )
+            recipe.tags.set(tags[: index % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=index + position + 1,
+                )
+                for position, ingredient in enumerate(
+                    ingredients[index % 2:index % 2 + 3],
+                )
+            )
+            cls.recipes.append(recipe)
+        reader = cls.users[3]
+        for author in cls.users[:3]:
+            Subscription.objects.create(user=reader, author=author)
+        Subscription.objects.create(user=cls.users[0], author=cls.users[1])
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=reader, recipe=recipe)
+        for recipe in cls.recipes[1::3]:
+            ShoppingCart.objects.create(user=reader, recipe=recipe)
+        cls.token = Token.objects.create(user=reader)
+
+    def get_content(self, path, query, fast, authenticated):
+        cache.clear()
+        headers = {}
+        if authenticated:
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.token.key}'
+        with override_settings(FAST_READ_SERIALIZERS=fast):
+            response = self.client.get(path, query, **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.content
+
+    def assert_same_output(self, path, queries, authenticated=(False, True)):
+        for query in queries:
+            for is_authenticated in authenticated:
+                with self.subTest(
+                    path=path,
+                    query=query,
+                    authenticated=is_authenticated,
+                ):
+                    expected = self.get_content(
+                        path,
+                        query,
+                        False,
+                        is_authenticated,
+                    )
+                    self.assertIn(b'"results":[{', expected)
+                    self.assertEqual(
+                        self.get_content(path, query, True, is_authenticated),
+                        expected,
+                    )
+
+    def test_recipe_list(self):
+        self.assert_same_output('/api/recipes/', RECIPE_QUERIES)
+
+    def test_filtered_recipe_list(self):
+        self.assert_same_output(
+            '/api/recipes/',
+            (
+                {'is_favorited': 1},
+                {'is_in_shopping_cart': 1, 'fields': 'id,is_favorited'},
+                {'tags': ['lunch', 'dinner'], 'expand': 'tags'},
+            ),
+            authenticated=(True,),
+        )
+
+    def test_user_list(self):
+        self.assert_same_output('/api/users/', USER_QUERIES)
+
+    def test_subscriptions(self):
+        self.assert_same_output(
+            '/api/users/subscriptions/',
+            SUBSCRIPTION_QUERIES,
+            authenticated=(True,),
+        )
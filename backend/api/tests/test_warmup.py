@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TransactionTestCase, override_settings
+
+from api.warmup import warm_caches
+from recipes.models import Recipe, Tag
+from users.models import User
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class WarmCachesTests(TransactionTestCase):
+    """Прогрев кэшей запросами в текущем процессе. Запросы выполняются
+    в потоках со своими соединениями с базой данных."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=1,
+            image='media/recipe.jpg',
+        )
+        recipe.tags.add(Tag.objects.create(name='Завтрак', slug='breakfast'))
+
+    @override_settings(CACHE_WARM_HOST='localhost:8000')
+    def test_visitor_request_served_from_warm_cache(self):
+        [(path, result, _)] = warm_caches(['/api/recipes/'], workers=1)
+        self.assertEqual(result, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(path, HTTP_HOST='localhost:8000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    @override_settings(CACHE_WARM_HOST='example.com')
+    def test_disallowed_host(self):
+        with self.assertRaises(ImproperlyConfigured):
+            warm_caches(['/api/recipes/'], workers=1)
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from pathlib import PurePosixPath
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from django.utils import timezone
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
+from PIL import Image, ImageFile
+from rest_framework import serializers
+
+UPLOAD_SALT = 'api.uploads'
+
+UPLOAD_DIR = 'uploads'
+
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class ImageUploadError(MultiPartParserError):
+    """Загружаемый файл не прошёл проверку по заголовку."""
+
+
+class ImageHeaderUploadHandler(TemporaryFileUploadHandler):
+    """Запись загружаемого файла во временный файл по частям.
+
+    Формат и размеры изображения проверяются по заголовку из первых
+    частей файла, поэтому неподходящая загрузка прерывается до получения
+    всего тела запроса.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.parser = ImageFile.Parser()
+        self.image_format = None
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            raise ImageUploadError(
+                f'Размер файла больше '
+                f'{settings.MAX_UPLOAD_SIZE // 2 ** 20} МБ.',
+            )
+        if self.image_format is None:
+            self.check_header(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        try:
+            self.parser.feed(raw_data)
+        except Image.DecompressionBombError:
+            raise ImageUploadError('Изображение слишком большое.')
+        except (OSError, SyntaxError, ValueError):
+            raise ImageUploadError('Файл не является изображением.')
+        image = self.parser.image
+        if image is None:
+            if self.received >= settings.IMAGE_HEADER_MAX_SIZE:
+                raise ImageUploadError('Файл не является изображением.')
+            return
+        self.parser = None
+        if image.format not in IMAGE_FORMATS:
+            raise ImageUploadError(
+                f'Формат {image.format} не поддерживается.',
+            )
+        width, height = image.size
+        if max(width, height) > settings.IMAGE_MAX_DIMENSION:
+            raise ImageUploadError(
+                f'Размер изображения больше '
+                f'{settings.IMAGE_MAX_DIMENSION} пикселей.',
+            )
+        self.image_format = image.format
+
+    def file_complete(self, file_size):
+        if self.image_format is None:
+            raise ImageUploadError('Файл не является изображением.')
+        return super().file_complete(file_size)
+
+
+class ImageUploadMixin:
+    """Потоковая обработка изображений в multipart-запросах вьюсета."""
+
+    def initial(self, request, *args, **kwargs):
+        request._request.upload_handlers = [
+            ImageHeaderUploadHandler(request._request),
+        ]
+        super().initial(request, *args, **kwargs)
+
+
+def save_upload(file, user):
+    """Сохранение загруженного изображения и подписанная ссылка на него
+    для последующей передачи в поле изображения."""
+    name = default_storage.save(
+        f'{UPLOAD_DIR}/{uuid.uuid4()}.{IMAGE_FORMATS[file.image.format]}',
+        file,
+    )
+    return signing.dumps({'name': name, 'user': user.id}, salt=UPLOAD_SALT)
+
+
+def load_upload(token, user):
+    """Имя файла по ссылке из save_upload."""
+    try:
+        upload = signing.loads(
+            token,
+            salt=UPLOAD_SALT,
+            max_age=settings.UPLOAD_TOKEN_MAX_AGE,
+        )
+    except signing.BadSignature:
+        raise serializers.ValidationError(
+            'Ссылка на загруженное изображение недействительна.',
+        )
+    if upload['user'] != user.id or not default_storage.exists(
+        upload['name'],
+    ):
+        raise serializers.ValidationError(
+            'Загруженное изображение не найдено.',
+        )
+    return upload['name']
+
+
+def purge_uploads():
+    """Удаление загруженных файлов, ссылки на которые истекли."""
+    threshold = timezone.now() - timedelta(
+        seconds=settings.UPLOAD_TOKEN_MAX_AGE,
+    )
+    try:
+        _, files = default_storage.listdir(UPLOAD_DIR)
+    except FileNotFoundError:
+        return []
+    names = [
+        f'{UPLOAD_DIR}/{file}'
+        for file in files
+        if default_storage.get_modified_time(f'{UPLOAD_DIR}/{file}')
+        < threshold
+    ]
+    for name in names:
+        default_storage.delete(name)
+    return names
+
+
+def is_upload_token(data):
+    return ';base64,' not in data and ':' in data
+
+
+class UploadImageField(Base64ImageField):
+    """Изображение в base64, файлом multipart-запроса или ссылкой на
+    изображение, загруженное через /api/uploads/images/."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return super(Base64FieldMixin, self).to_internal_value(data)
+        if isinstance(data, str) and is_upload_token(data):
+            name = load_upload(data, self.context['request'].user)
+            return File(
+                default_storage.open(name),
+                name=PurePosixPath(name).name,
+            )
+        return super().to_internal_value(data)
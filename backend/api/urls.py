@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api import views
+from api.events import events_view
 
 
 v1_router = DefaultRouter()
@@ -17,5 +18,13 @@ v1_router.register('users', views.UserViewSet, basename='user')
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
+    path('batch/', views.BatchView.as_view(), name='batch'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('events/', events_view, name='events'),
+    path(
+        'uploads/images/',
+        views.ImageUploadView.as_view(),
+        name='image-upload',
+    ),
     path('', include(v1_router.urls)),
 ]
@@ -1,22 +1,45 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Exists, OuterRef, Sum
+from django.db.models import Case, Count, Sum, When
 from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from djoser.views import UserViewSet
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 import short_url
 
+from api.batch import run_batch
+from api.cache import get_or_compute, normalize_params
+from api.facets import get_facets
 from api.filters import IngredientFilter, RecipeFilter
+from api.mixins import (
+    ALL_FIELDS,
+    PublicCacheMixin,
+    SparseFieldsMixin,
+    StreamingListMixin,
+)
 from api.pagination import LimitPagination
 from api.permissions import IsAuthorOrReadOnly
+from api.projections import (
+    RecipeProjection,
+    SubscriptionProjection,
+    UserProjection,
+    recipe_values,
+    subscription_values,
+    user_values,
+)
 from api.serializers import (
+    BatchSerializer,
     FavoriteSerializer,
+    ImageUploadSerializer,
     IngredientSerializer,
     RecipeGetSerializer,
     RecipePostSerializer,
@@ -26,26 +49,66 @@ from api.serializers import (
     UserGetSerializer,
     UserSubscriptionSerializer,
 )
+from api.uploads import ImageUploadMixin, save_upload
+from recipes.changelog import get_changes
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
-    RecipeShortUrl,
     ShoppingCart,
     Tag,
 )
+from recipes.pantry import (
+    PantryMatches,
+    get_pantry_index,
+    remove_from_pantry_index,
+)
+from recipes.tasks import create_short_url
 from users.models import Subscription
 
 User = get_user_model()
 
+USER_FILTERS = {
+    'is_favorited': Favorite._meta.model_name,
+    'is_in_shopping_cart': ShoppingCart._meta.model_name,
+}
+
+FALSE_VALUES = ('0', 'false', 'False')
+
+
+def order_by_ids(queryset, ids):
+    """Сортировка объектов в порядке ids."""
+    return queryset.order_by(
+        Case(*(When(pk=pk, then=position) for position, pk in enumerate(ids))),
+    )
+
 
-class UserViewSet(UserViewSet):
+class UserViewSet(ImageUploadMixin, SparseFieldsMixin, UserViewSet):
     """Вьюсет для работы с пользователями."""
 
     queryset = User.objects.all()
     serializer_class = UserGetSerializer
     pagination_class = LimitPagination
+    sparse_actions = ('list', 'retrieve', 'me', 'subscriptions')
+
+    def get_sparse_serializer_class(self):
+        if self.action == 'subscriptions':
+            return UserSubscriptionSerializer
+        return UserGetSerializer
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(
+            user_values(
+                self.filter_queryset(self.get_queryset()),
+                self.get_sparse_fields(),
+            ),
+        )
+        return self.get_paginated_response(
+            UserProjection(request).render(page),
+        )
 
     @action(
         detail=False,
@@ -95,6 +158,13 @@ class UserViewSet(UserViewSet):
             .annotate(recipes_count=Count('recipes'))
             .order_by('username')
         )
+        if settings.FAST_READ_SERIALIZERS:
+            page = self.paginate_queryset(
+                subscription_values(users, self.get_sparse_fields()),
+            )
+            return self.get_paginated_response(
+                SubscriptionProjection(request).render(page),
+            )
         paginated_queryset = self.paginate_queryset(users)
         serializer = UserSubscriptionSerializer(
             paginated_queryset,
@@ -128,17 +198,95 @@ class UserViewSet(UserViewSet):
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class ImageUploadView(ImageUploadMixin, APIView):
+    """Предварительная загрузка изображения multipart-запросом.
+
+    Возвращает ссылку, которую можно передать в поле image рецепта или
+    avatar пользователя вместо base64.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request):
+        serializer = ImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            {
+                'image': save_upload(
+                    serializer.validated_data['image'],
+                    request.user,
+                ),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class BatchView(APIView):
+    """Несколько GET-запросов к API одним запросом.
+
+    Пользователь аутентифицируется один раз, подзапросы выполняются по
+    очереди в текущем процессе и используют общие кэши и загрузчики.
+    Ответ содержит код и тело ответа на каждый подзапрос.
+    """
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            {
+                'responses': run_batch(
+                    request,
+                    serializer.validated_data['requests'],
+                ),
+            },
+        )
+
+
+class SyncView(APIView):
+    """Изменения избранного, корзины и подписок пользователя после
+    курсора ?since= из предыдущего ответа."""
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError(
+                {'since': 'Курсор должен быть неотрицательным числом.'},
+            )
+        changes, cursor, has_more = get_changes(
+            request.user,
+            since,
+            settings.SYNC_MAX_CHANGES,
+        )
+        return Response({'cursor': cursor, 'has_more': has_more, **changes})
+
+
+class TagViewSet(
+    PublicCacheMixin,
+    StreamingListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Вьюсет для работы с тегами."""
 
+    public_cache_generations = ('recipes',)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    PublicCacheMixin,
+    StreamingListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Вьюсет для работы с ингредиентами."""
 
+    public_cache_generations = ('ingredients',)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
@@ -147,41 +295,284 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    PublicCacheMixin,
+    ImageUploadMixin,
+    SparseFieldsMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для работы с рецептами."""
 
+    public_cache_actions = ('list', 'retrieve', 'similar', 'facets')
+    public_cache_generations = ('recipes', 'users', 'rankings')
     pagination_class = LimitPagination
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    sparse_actions = ('list', 'retrieve', 'similar', 'pantry')
 
     def get_queryset(self):
-        favorited_recipes = Favorite.objects.filter(
-            recipe=OuterRef('pk'),
-            user=self.request.user.id,
+        sparse = self.get_sparse_fields()
+        if self.action not in self.sparse_actions:
+            sparse = ALL_FIELDS
+        if sparse.fields is None:
+            return Recipe.objects.select_related(
+                'author',
+            ).all().prefetch_related('tags', 'ingredients')
+        return self.get_sparse_queryset(sparse)
+
+    @staticmethod
+    def get_sparse_queryset(sparse):
+        """Рецепты с загрузкой только запрошенных полей и связей."""
+        queryset = Recipe.objects.only(
+            'id',
+            'pub_date',
+            *(
+                name
+                for name in (
+                    'author',
+                    'name',
+                    'image',
+                    'image_variants',
+                    'text',
+                    'cooking_time',
+                )
+                if name in sparse.fields
+            ),
         )
-        cart_recipes = ShoppingCart.objects.filter(
-            recipe=OuterRef('pk'),
-            user=self.request.user.id,
+        if 'author' in sparse.expand:
+            queryset = queryset.select_related('author')
+        if 'tags' in sparse.fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in sparse.expand:
+            queryset = queryset.prefetch_related('ingredients')
+        elif 'ingredients' in sparse.fields:
+            queryset = queryset.prefetch_related('recipe_ingredients')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Страница рецептов из кэша, ключ которого строится по
+        нормализованным параметрам запроса и поколениям данных.
+
+        Анонимным пользователям ответ отдаётся из кэша целиком,
+        авторизованным — кэшируются id рецептов страницы и общее кол-во,
+        а рецепты с флагами пользователя загружаются по id.
+        """
+        params = normalize_params(
+            request.query_params,
+            {
+                *self.filterset_class.base_filters,
+                self.paginator.page_query_param,
+                self.paginator.page_size_query_param,
+                'fields',
+                'expand',
+            },
         )
-        queryset = Recipe.objects.select_related(
-            'author',
-        ).all().prefetch_related('tags', 'ingredients')
-        if self.request.user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited=Exists(favorited_recipes),
-                is_in_shopping_cart=Exists(cart_recipes),
+        generations = ['recipes']
+        if any(name == 'ordering' for name, _ in params):
+            generations.append('rankings')
+        if not request.user.is_authenticated:
+            return Response(
+                get_or_compute(
+                    'recipes-list',
+                    (*generations, 'users'),
+                    [('host', request.get_host()), *params],
+                    lambda: self.list_page(request).data,
+                    settings.RECIPES_CACHE_TIMEOUT,
+                ),
             )
-        return queryset
+        user_filters = [
+            USER_FILTERS[name]
+            for name, value in params
+            if name in USER_FILTERS and value not in FALSE_VALUES
+        ]
+        if user_filters:
+            generations.extend(
+                f'{name}:{request.user.id}' for name in user_filters
+            )
+            params.append(('user', request.user.id))
+        count, ids = get_or_compute(
+            'recipes-ids',
+            generations,
+            params,
+            self.list_ids,
+            settings.RECIPES_CACHE_TIMEOUT,
+        )
+        self.paginate_queryset(range(count))
+        return self.get_paginated_response(
+            self.render_recipes(
+                order_by_ids(self.get_queryset().filter(pk__in=ids), ids),
+            )
+            if ids
+            else [],
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт; анонимным пользователям ответ отдаётся из кэша."""
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(
+            get_or_compute(
+                'recipe-detail',
+                ('recipes', 'users'),
+                [
+                    ('host', request.get_host()),
+                    ('pk', kwargs['pk']),
+                    *normalize_params(
+                        request.query_params,
+                        ('fields', 'expand'),
+                    ),
+                ],
+                lambda: super(RecipeViewSet, self).retrieve(
+                    request,
+                    *args,
+                    **kwargs,
+                ).data,
+                settings.RECIPES_CACHE_TIMEOUT,
+            ),
+        )
+
+    def list_page(self, request):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request)
+        page = self.paginate_queryset(
+            recipe_values(
+                self.filter_queryset(self.get_queryset()),
+                self.get_sparse_fields(),
+            ),
+        )
+        return self.get_paginated_response(
+            RecipeProjection(request).render(page),
+        )
+
+    def list_ids(self):
+        """Общее кол-во рецептов по фильтрам и id рецептов страницы."""
+        ids = self.paginate_queryset(
+            self.filter_queryset(Recipe.objects.all()).values_list(
+                'pk',
+                flat=True,
+            ),
+        )
+        return self.paginator.page.paginator.count, list(ids)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in self.sparse_actions:
             return RecipeGetSerializer
         return RecipePostSerializer
 
+    def render_recipes(self, recipes):
+        if settings.FAST_READ_SERIALIZERS:
+            return RecipeProjection(self.request).render(
+                recipe_values(recipes, self.get_sparse_fields()),
+            )
+        return self.get_serializer(recipes, many=True).data
+
+    def render_recipes_by_id(self, recipes):
+        """Словарь {id рецепта: представление} по тем же строкам, что
+        были выведены: ?fields= может исключить id из представления."""
+        if settings.FAST_READ_SERIALIZERS:
+            rows = list(recipe_values(recipes, self.get_sparse_fields()))
+            data = RecipeProjection(self.request).render(rows)
+            return dict(zip((row['id'] for row in rows), data))
+        recipes = list(recipes)
+        data = self.get_serializer(recipes, many=True).data
+        return dict(zip((recipe.pk for recipe in recipes), data))
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        """Рецепты, наиболее близкие по составу ингредиентов."""
+        get_object_or_404(Recipe, pk=pk)
+        recipes = self.get_queryset().filter(
+            similar_to__recipe_id=pk,
+        ).order_by('-similar_to__score', 'similar_to__similar_id')
+        return Response(self.render_recipes(recipes))
+
+    @action(detail=False)
+    def facets(self, request):
+        """Кол-во рецептов по тегам и времени приготовления с учётом
+        текущих фильтров."""
+        # Сортировка не влияет на кол-во рецептов, поэтому не входит
+        # ни в фильтры, ни в ключ кэша.
+        data = request.query_params.copy()
+        data.pop('ordering', None)
+        filterset = self.filterset_class(
+            data,
+            self.get_queryset(),
+            request=request,
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        queryset = filterset.qs
+        params = normalize_params(
+            data,
+            set(self.filterset_class.base_filters),
+        )
+        if any(
+            name in USER_FILTERS and value not in FALSE_VALUES
+            for name, value in params
+        ):
+            return Response(get_facets(queryset))
+        return Response(
+            get_or_compute(
+                'facets',
+                ('recipes',),
+                params,
+                lambda: get_facets(queryset),
+                settings.FACETS_CACHE_TIMEOUT,
+            ),
+        )
+
+    @action(detail=False)
+    def pantry(self, request):
+        """Рецепты по имеющимся ингредиентам: сначала те, для которых
+        есть все ингредиенты, затем с одним недостающим и т.д."""
+        try:
+            ingredient_ids = {
+                int(value)
+                for param in request.query_params.getlist('ingredients')
+                for value in param.split(',')
+                if value.strip()
+            }
+        except ValueError:
+            ingredient_ids = None
+        if not ingredient_ids:
+            raise ValidationError(
+                {
+                    'ingredients': [
+                        'Укажите id ингредиентов через запятую.',
+                    ],
+                },
+            )
+        # Рецепты, удаление которых не попало в журнал индекса,
+        # исключаются из него, и страница строится заново.
+        while True:
+            page = dict(
+                self.paginate_queryset(
+                    PantryMatches(
+                        *get_pantry_index().match(ingredient_ids),
+                    ),
+                ),
+            )
+            deleted = set(page).difference(
+                Recipe.objects.filter(pk__in=page).values_list(
+                    'pk',
+                    flat=True,
+                ),
+            )
+            if not deleted:
+                break
+            for recipe_id in deleted:
+                remove_from_pantry_index(recipe_id)
+        data = self.render_recipes_by_id(
+            order_by_ids(self.get_queryset().filter(pk__in=page), page),
+        )
+        for recipe_id, recipe in data.items():
+            recipe['missing_ingredients'] = page[recipe_id]
+        return self.get_paginated_response(list(data.values()))
+
     @action(
         detail=True,
         url_path='get-link',
@@ -190,10 +581,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Возвращает ссылку рецепта."""
         recipe = get_object_or_404(Recipe, pk=pk)
         short_link = short_url.encode_url(recipe.id)
-        RecipeShortUrl.objects.get_or_create(
-            recipe=recipe, short_url=short_link,
-        )
-        recipe.save()
+        create_short_url.delay(recipe.id, short_link)
         response = (
             f'{settings.ALLOWED_HOSTS[0]}'
             f'{reverse("short_url", args=(short_link,))}'
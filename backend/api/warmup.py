@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.exceptions import DisallowedHost, ImproperlyConfigured
+from django.db import close_old_connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from recipes.models import RecipeRanking
+from recipes.pantry import get_pantry_index
+from recipes.similarity import get_index
+
+
+def get_warm_paths(recipes=None):
+    """Пути из CACHE_WARM_PATHS и страницы самых популярных за последние
+    дни рецептов."""
+    if recipes is None:
+        recipes = settings.CACHE_WARM_RECIPES
+    recipe_ids = RecipeRanking.objects.order_by(
+        '-trending',
+        '-recipe',
+    ).values_list('recipe_id', flat=True)[:recipes]
+    return [
+        *settings.CACHE_WARM_PATHS,
+        *(reverse('recipe-detail', args=(pk,)) for pk in recipe_ids),
+    ]
+
+
+def check_warm_host():
+    """Проверка CACHE_WARM_HOST по ALLOWED_HOSTS так же, как хоста
+    запроса посетителя, чтобы прогрев не завершался DisallowedHost на
+    каждом пути."""
+    try:
+        RequestFactory().get(
+            '/',
+            HTTP_HOST=settings.CACHE_WARM_HOST,
+        ).get_host()
+    except DisallowedHost as error:
+        raise ImproperlyConfigured(
+            f'CACHE_WARM_HOST не входит в ALLOWED_HOSTS: {error}',
+        )
+
+
+def fetch_local(path):
+    """Анонимный GET-запрос к представлению в текущем процессе: ответ
+    попадает в те же ключи кэша, что и ответ на запрос посетителя."""
+    match = resolve(urlsplit(path).path)
+    response = match.func(
+        RequestFactory().get(path, HTTP_HOST=settings.CACHE_WARM_HOST),
+        *match.args,
+        **match.kwargs,
+    )
+    if hasattr(response, 'render'):
+        response.render()
+    return response.status_code
+
+
+def fetch_remote(url):
+    with urlopen(url, timeout=settings.CACHE_WARM_TIMEOUT) as response:
+        response.read()
+        return response.status
+
+
+def warm_path(path, base_url=None):
+    """Запрос пути: (путь, код ответа или текст ошибки, время)."""
+    close_old_connections()
+    started = perf_counter()
+    try:
+        result = (
+            fetch_local(path)
+            if base_url is None
+            else fetch_remote(f'{base_url.rstrip("/")}{path}')
+        )
+    except Exception as error:
+        result = f'{type(error).__name__}: {error}'
+    finally:
+        close_old_connections()
+    return path, result, perf_counter() - started
+
+
+def warm_caches(paths=None, base_url=None, workers=None):
+    """Параллельный прогрев путей; base_url — адрес nginx или бэкенда,
+    чтобы прогреть и кэш прокси. Возвращает результаты warm_path."""
+    if base_url is None:
+        check_warm_host()
+    if paths is None:
+        paths = get_warm_paths()
+    with ThreadPoolExecutor(
+        max_workers=workers or settings.CACHE_WARM_WORKERS,
+        thread_name_prefix='warmup',
+    ) as executor:
+        return list(
+            executor.map(lambda path: warm_path(path, base_url), paths),
+        )
+
+
+def warm_indexes():
+    """Загрузка индексов похожих рецептов и подбора по продуктам в память
+    процесса."""
+    get_index()
+    get_pantry_index()
@@ -28,9 +28,12 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -79,6 +83,16 @@ else:
         },
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -112,6 +126,48 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+INDEX_DIR = os.getenv('INDEX_DIR', BASE_DIR / 'indexes')
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
+IMAGE_HEADER_MAX_SIZE = 512 * 1024
+
+IMAGE_MAX_DIMENSION = 10000
+
+UPLOAD_TOKEN_MAX_AGE = 24 * 60 * 60
+
+STREAMING_CHUNK_SIZE = int(os.getenv('STREAMING_CHUNK_SIZE', 2000))
+
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+
+SYNC_MAX_CHANGES = int(os.getenv('SYNC_MAX_CHANGES', 1000))
+
+SYNC_SETTLE_TIME = int(os.getenv('SYNC_SETTLE_TIME', 5))
+
+CHANGE_LOG_COMPACT_AFTER = int(
+    os.getenv('CHANGE_LOG_COMPACT_AFTER', 7 * 24 * 60 * 60),
+)
+
+EVENTS_MAX_CONNECTIONS = int(os.getenv('EVENTS_MAX_CONNECTIONS', 1000))
+
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+
+EVENTS_HEARTBEAT = int(os.getenv('EVENTS_HEARTBEAT', 15))
+
+EVENTS_MAX_AGE = int(os.getenv('EVENTS_MAX_AGE', 5 * 60))
+
+EVENTS_RETRY = 3000
+
+MEDIA_GC_GRACE = int(os.getenv('MEDIA_GC_GRACE', 24 * 60 * 60))
+
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False').lower() == 'true'
+
+TASKS_POLL_INTERVAL = float(os.getenv('TASKS_POLL_INTERVAL', 1))
+
+TASKS_METRICS_PORT = int(os.getenv('TASKS_METRICS_PORT', 9100))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 DJOSER = {
@@ -132,7 +188,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -142,4 +207,59 @@ REST_FRAMEWORK = {
     'PAGINATE_BY_PARAM': 'limit',
 }
 
+TOKEN_AUTH_CACHE_SIZE = int(os.getenv('TOKEN_AUTH_CACHE_SIZE', 10000))
+
+TOKEN_AUTH_CACHE_TTL = int(os.getenv('TOKEN_AUTH_CACHE_TTL', 300))
+
+TOKEN_AUTH_SHARED_CACHE = os.getenv('TOKEN_AUTH_SHARED_CACHE', 'default')
+
+FACETS_CACHE_TIMEOUT = int(os.getenv('FACETS_CACHE_TIMEOUT', 600))
+
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', 300))
+
+PUBLIC_CACHE_MAX_AGE = int(os.getenv('PUBLIC_CACHE_MAX_AGE', 5))
+
+SHORT_URL_CACHE_MAX_AGE = int(
+    os.getenv('SHORT_URL_CACHE_MAX_AGE', 24 * 60 * 60),
+)
+
+CACHE_WARM_PATHS = os.getenv(
+    'CACHE_WARM_PATHS',
+    '/api/tags/,/api/ingredients/,/api/recipes/,/api/recipes/?page=2,'
+    '/api/recipes/?ordering=popular,/api/recipes/?ordering=trending,'
+    '/api/recipes/facets/',
+).split(',')
+
+CACHE_WARM_RECIPES = int(os.getenv('CACHE_WARM_RECIPES', 20))
+
+CACHE_WARM_WORKERS = int(os.getenv('CACHE_WARM_WORKERS', 4))
+
+CACHE_WARM_HOST = os.getenv('CACHE_WARM_HOST', ALLOWED_HOSTS[0])
+
+CACHE_WARM_TIMEOUT = int(os.getenv('CACHE_WARM_TIMEOUT', 30))
+
+CACHE_WARM_DELAY = int(os.getenv('CACHE_WARM_DELAY', 30))
+
+FAST_READ_SERIALIZERS = (
+    os.getenv('FAST_READ_SERIALIZERS', 'True').lower() == 'true'
+)
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+
+PROFILING_HEADER = 'X-Profile'
+
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sampling')
+
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005))
+
+PROFILING_DIR = os.getenv('PROFILING_DIR', BASE_DIR / 'profiles')
+
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', 100))
+
 CSRF_TRUSTED_ORIGINS = ['https://sickmoqchima.ddns.net']
@@ -3,12 +3,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.metrics import metrics_view
 from recipes.views import short_redirect_view
 
 urlpatterns = [
     path('api/', include('api.urls')),
     path('admin/', admin.site.urls),
     path('s/<str:short_link>/', short_redirect_view, name='short_url'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
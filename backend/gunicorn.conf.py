@@ -0,0 +1,48 @@
+import os
+import shutil
+import subprocess
+import sys
+
+bind = '0.0.0.0:8000'
+
+worker_class = 'gthread'
+
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+warm_caches_on_start = (
+    os.environ.get('WARM_CACHES_ON_START', 'False').lower() == 'true'
+)
+
+
+def on_starting(server):
+    """Очищает хранилище метрик, оставшееся от прошлого запуска."""
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Помечает метрики завершившегося воркера."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Прогревает общие кэши в отдельном процессе, не задерживая приём
+    запросов."""
+    if warm_caches_on_start:
+        subprocess.Popen(
+            (sys.executable, 'manage.py', 'warm_caches'),
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+
+
+def post_worker_init(worker):
+    """Загружает индексы в память воркера до первого запроса."""
+    if warm_caches_on_start:
+        from api.warmup import warm_indexes
+
+        warm_indexes()
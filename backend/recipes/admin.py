@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
 
+from api.cache import get_or_compute
+from recipes.constants import ADMIN_FILTER_CACHE_TIMEOUT
+from recipes.exports import make_export_actions
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -11,12 +15,41 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.queries import count_related
+from recipes.tasks import schedule_image_processing, update_recipe_indexes
 
 admin.site.empty_value_display = 'Не задано'
 
 
+class CachedValuesListFilter(admin.AllValuesFieldListFilter):
+    """Фильтр по значениям поля, список которых берётся из кэша, а не
+    из SELECT DISTINCT по всей таблице на каждой странице.
+
+    Кэш сбрасывается при смене поколений list_filter_generations модели.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(
+            field,
+            request,
+            params,
+            model,
+            model_admin,
+            field_path,
+        )
+        lookup_choices = self.lookup_choices
+        self.lookup_choices = get_or_compute(
+            'admin-filter',
+            model_admin.list_filter_generations,
+            [('model', model._meta.label), ('field', field_path)],
+            lambda: list(lookup_choices),
+            ADMIN_FILTER_CACHE_TIMEOUT,
+        )
+
+
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
     min_num = 1
     extra = 1
 
@@ -26,7 +59,8 @@ class TagAdmin(admin.ModelAdmin):
     """Интерфейс админ-зоны тегов."""
 
     list_display = ('name', 'slug')
-    list_filter = ('name',)
+    list_filter = (('name', CachedValuesListFilter),)
+    list_filter_generations = ('recipes',)
     search_fields = ('name',)
     list_display_links = ('name',)
 
@@ -39,13 +73,19 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
         'measurement_unit',
     )
-    list_filter = ('measurement_unit',)
+    list_filter = (('measurement_unit', CachedValuesListFilter),)
+    list_filter_generations = ('ingredients',)
     search_fields = ('name',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    """Интерфейс админ-зоны рецептов."""
+    """Интерфейс админ-зоны рецептов.
+
+    Кол-во добавлений в избранное считается подзапросом, теги и
+    ингредиенты загружаются одним запросом на страницу, поэтому число
+    запросов не зависит от кол-ва строк.
+    """
 
     inlines = (RecipeIngredientInline,)
     list_display = (
@@ -56,12 +96,39 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_tags',
         'get_ingredients',
     )
+    list_select_related = ('author',)
     list_filter = ('tags',)
-    search_fields = ('name', 'author')
+    search_fields = ('name', 'author__username__exact', 'author__email__exact')
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
+    actions = (
+        'rebuild_image_variants',
+        'rebuild_indexes',
+        *make_export_actions('recipes'),
+    )
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                favorites_count=count_related(Favorite.objects, 'recipe'),
+            )
+            .prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('name')),
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.only('name'),
+                ),
+            )
+        )
 
-    @admin.display(description='Кол-во добавлений в избранное')
+    @admin.display(
+        description='Кол-во добавлений в избранное',
+        ordering='favorites_count',
+    )
     def amount_add_in_favorite(self, obj):
-        return obj.users_favorite.count()
+        return obj.favorites_count
 
     @admin.display(description='Изображение')
     def image(self, obj):
@@ -80,14 +147,32 @@ class RecipeAdmin(admin.ModelAdmin):
             [ingredient.name for ingredient in obj.ingredients.all()],
         )
 
+    @admin.action(description='Пересоздать уменьшенные копии фото')
+    def rebuild_image_variants(self, request, queryset):
+        """Ставит в фоновую очередь построение копий фото."""
+        for recipe in queryset.only('pk', 'image', 'image_variants'):
+            schedule_image_processing(recipe, 'image', force=True)
+        self.message_user(request, 'Задачи поставлены в очередь.')
+
+    @admin.action(description='Обновить похожие рецепты и подбор')
+    def rebuild_indexes(self, request, queryset):
+        """Ставит в фоновую очередь обновление индексов рецептов."""
+        for pk in queryset.values_list('pk', flat=True):
+            update_recipe_indexes.delay(pk)
+        self.message_user(request, 'Задачи поставлены в очередь.')
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     """Интерфейс админ-зоны избранного."""
 
     list_display = ('user', 'recipe')
-    search_fields = ('user',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username__exact', 'user__email__exact')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     list_display_links = ('user',)
+    actions = make_export_actions('favorites')
 
 
 @admin.register(ShoppingCart)
@@ -95,8 +180,12 @@ class ShoppingCart(admin.ModelAdmin):
     """Интерфейс админ-зоны корзины."""
 
     list_display = ('user', 'recipe')
-    search_fields = ('user',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username__exact', 'user__email__exact')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     list_display_links = ('user',)
+    actions = make_export_actions('shopping_cart')
 
 
 @admin.register(RecipeShortUrl)
@@ -104,6 +193,9 @@ class RecipeShortUrlAdmin(admin.ModelAdmin):
     """Интерфейс админ-зоны коротких ссылок."""
 
     list_display = ('recipe', 'short_url')
+    list_select_related = ('recipe',)
+    autocomplete_fields = ('recipe',)
+    show_full_result_count = False
     list_display_links = ('recipe',)
 
 
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from itertools import takewhile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from recipes.models import ChangeLog, Favorite, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+CHANGE_SOURCES = {
+    Favorite: (ChangeLog.Kind.FAVORITE, 'recipe_id'),
+    ShoppingCart: (ChangeLog.Kind.SHOPPING_CART, 'recipe_id'),
+    Subscription: (ChangeLog.Kind.SUBSCRIPTION, 'author_id'),
+}
+
+
+def deleted_with_user(instance, origin):
+    """Объект удаляется каскадно вместе со своим пользователем, и
+    журнал вести уже некому."""
+    if isinstance(origin, User):
+        return origin.pk == instance.user_id
+    return (
+        isinstance(origin, QuerySet)
+        and origin.model is User
+        and origin.filter(pk=instance.user_id).exists()
+    )
+
+
+def record_change(instance, added):
+    """Запись о добавлении или удалении объекта модели из
+    CHANGE_SOURCES."""
+    kind, field = CHANGE_SOURCES[type(instance)]
+    return ChangeLog.objects.create(
+        user_id=instance.user_id,
+        kind=kind,
+        object_id=getattr(instance, field),
+        added=added,
+    )
+
+
+def get_settle_threshold():
+    """Записи журнала старше этого момента считаются устоявшимися.
+
+    id записи выдаётся при вставке, а видна она становится после
+    фиксации транзакции, поэтому запись с меньшим id может появиться
+    позже записи с большим. Курсор не продвигается дальше первой записи
+    моложе SYNC_SETTLE_TIME секунд, чтобы такие записи не пропускались.
+    """
+    return timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_TIME)
+
+
+def get_changes(user, since, limit):
+    """Устоявшиеся изменения пользователя после курсора since.
+
+    Возвращает словарь {раздел: {'added': [...], 'removed': [...]}},
+    курсор для следующего запроса и признак того, что изменения
+    не уместились в limit. Несколько изменений одного объекта
+    сворачиваются в последнее.
+    """
+    threshold = get_settle_threshold()
+    entries = list(
+        takewhile(
+            lambda entry: entry[-1] <= threshold,
+            ChangeLog.objects.filter(user=user, id__gt=since)
+            .order_by('id')
+            .values_list('id', 'kind', 'object_id', 'added', 'created_at')[
+                : limit + 1
+            ],
+        ),
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    states = {kind: {} for kind in ChangeLog.Kind.values}
+    for _, kind, object_id, added, _ in entries:
+        states[kind][object_id] = added
+    changes = {
+        kind: {
+            'added': [pk for pk, added in objects.items() if added],
+            'removed': [pk for pk, added in objects.items() if not added],
+        }
+        for kind, objects in states.items()
+    }
+    cursor = entries[-1][0] if entries else since
+    return changes, cursor, has_more
+
+
+def get_settled_cursor(user):
+    """Курсор, после которого get_changes вернёт все изменения,
+    не устоявшиеся на текущий момент."""
+    entries = ChangeLog.objects.filter(user=user)
+    unsettled = (
+        entries.filter(created_at__gt=get_settle_threshold())
+        .order_by('id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    if unsettled is not None:
+        entries = entries.filter(id__lt=unsettled)
+    return entries.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def compact_change_log(older_than):
+    """Удаление записей старше older_than секунд, после которых в журнале
+    есть более поздняя запись о том же объекте.
+
+    Последняя запись каждого объекта сохраняется, поэтому клиент
+    с любым курсором получает то же итоговое состояние, что и до
+    сжатия.
+    """
+    threshold = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = (
+        ChangeLog.objects.filter(created_at__lt=threshold)
+        .filter(
+            Exists(
+                ChangeLog.objects.filter(
+                    user=OuterRef('user'),
+                    kind=OuterRef('kind'),
+                    object_id=OuterRef('object_id'),
+                    id__gt=OuterRef('id'),
+                ),
+            ),
+        )
+        .delete()
+    )
+    return deleted
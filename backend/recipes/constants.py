@@ -17,3 +17,27 @@ MEASUREMENT_UNIT_MAX_CHAR = 64
 SHORT_URL_MAX = 20
 
 MAX_CHAR = 20
+
+SIMILAR_RECIPES_COUNT = 20
+
+SIMILAR_RECIPES_CANDIDATES = 1000
+
+FAVORITE_WEIGHT = 1.0
+
+SHOPPING_CART_WEIGHT = 0.5
+
+POPULAR_HALF_LIFE = 30 * 24 * 60 * 60
+
+TRENDING_HALF_LIFE = 24 * 60 * 60
+
+COOKING_TIME_BUCKETS = (15, 30, 60)
+
+IMAGE_SIZES = {'small': 320, 'medium': 960}
+
+IMAGE_QUALITY = 80
+
+MEDIA_NAME_MAX_CHAR = 255
+
+CHANGE_KIND_MAX_CHAR = 16
+
+ADMIN_FILTER_CACHE_TIMEOUT = 60 * 60
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import logging
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import features, Image, ImageOps
+
+from recipes.constants import IMAGE_QUALITY, IMAGE_SIZES
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pillow_avif = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = tuple(
+    (extension, image_format)
+    for extension, image_format, available in (
+        ('avif', 'AVIF', pillow_avif is not None),
+        ('webp', 'WEBP', features.check('webp')),
+        ('jpeg', 'JPEG', True),
+    )
+    if available
+)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='images',
+        )
+    return _executor
+
+
+def variant_name(name, size, extension):
+    path = PurePosixPath(name)
+    return str(
+        PurePosixPath('variants') / path.parent / f'{path.stem}_{size}'
+    ) + f'.{extension}'
+
+
+def make_variants(name):
+    """Уменьшенные копии изображения в каждом из IMAGE_FORMATS:
+    {'source': name, размер: {формат: имя файла}}."""
+    with default_storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+    variants = {'source': name}
+    for size, width in IMAGE_SIZES.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((width, width), Image.LANCZOS)
+        variants[size] = {}
+        for extension, image_format in IMAGE_FORMATS:
+            buffer = BytesIO()
+            thumbnail.save(
+                buffer,
+                image_format,
+                quality=IMAGE_QUALITY,
+                optimize=image_format == 'JPEG',
+                progressive=image_format == 'JPEG',
+            )
+            target = variant_name(name, size, extension)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            variants[size][extension] = default_storage.save(
+                target,
+                ContentFile(buffer.getvalue()),
+            )
+    return variants
+
+
+def needs_variants(instance, field):
+    name = getattr(instance, field).name or None
+    variants = getattr(instance, f'{field}_variants') or {}
+    return variants.get('source') != name
+
+
+def process_image(model, pk, field):
+    """Построение копий изображения поля field объекта model.
+
+    Результат сохраняется, только если изображение не сменилось за время
+    обработки.
+    """
+    close_old_connections()
+    name = None
+    try:
+        name = model.objects.filter(pk=pk).values_list(
+            field,
+            flat=True,
+        ).first()
+        objects = model.objects.filter(pk=pk)
+        if name:
+            objects = objects.filter(**{field: name})
+        objects.update(
+            **{f'{field}_variants': make_variants(name) if name else {}},
+        )
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+        raise
+    finally:
+        close_old_connections()
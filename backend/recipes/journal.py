@@ -0,0 +1,93 @@
+import fcntl
+import os
+
+import numpy as np
+
+
+class JournaledIndex:
+    """Индекс рецептов по ингредиентам с журналом изменений.
+
+    Основа индекса перестраивается командой, а изменения рецептов между
+    перестроениями дописываются в журнал строками
+    «recipe_id:ingredient_id,...». Прочитанные записи перекрывают строки
+    основы: overlay хранит новые наборы ингредиентов, masked отмечает
+    устаревшие строки. Подклассы задают отсортированный recipe_ids.
+    """
+
+    def reset_journal(self):
+        self.overlay = {}
+        self.masked = np.zeros(len(self.recipe_ids), dtype=bool)
+        self.journal_inode = None
+        self.journal_offset = 0
+
+    def apply(self, recipe_id, ingredient_ids):
+        """Замена набора ингредиентов рецепта; пустой набор — удаление."""
+        self.overlay[recipe_id] = frozenset(ingredient_ids)
+        row = np.searchsorted(self.recipe_ids, recipe_id)
+        if row < len(self.recipe_ids) and self.recipe_ids[row] == recipe_id:
+            self.masked[row] = True
+
+    def sync_journal(self, path):
+        """Применение новых записей журнала с последнего чтения."""
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            inode = os.fstat(file.fileno()).st_ino
+            if inode != self.journal_inode:
+                self.reset_journal()
+                self.journal_inode = inode
+            file.seek(self.journal_offset)
+            data = file.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            recipe_id, _, ingredient_ids = line.decode().partition(':')
+            self.apply(
+                int(recipe_id),
+                map(int, filter(None, ingredient_ids.split(','))),
+            )
+        self.journal_offset += end
+
+
+def open_journal(path):
+    """Журнал под эксклюзивной блокировкой; файл, заменённый при
+    перестроении, открывается заново."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        file = open(path, 'ab')
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(file.fileno()).st_ino == os.stat(path).st_ino:
+                return file
+        except FileNotFoundError:
+            pass
+        file.close()
+
+
+def write_journal(path, recipe_id, ingredient_ids):
+    line = f'{recipe_id}:{",".join(map(str, sorted(ingredient_ids)))}\n'
+    with open_journal(path) as file:
+        file.write(line.encode())
+
+
+def get_journal_size(path):
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def truncate_journal(path, offset):
+    """Удаление из журнала записей до offset после перестроения индекса.
+
+    Записи, сделанные во время перестроения, сохраняются: они могли не
+    попасть в выборку из базы данных.
+    """
+    with open_journal(path):
+        with open(path, 'rb') as journal:
+            journal.seek(offset)
+            tail = journal.read()
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        tmp_path.write_bytes(tail)
+        os.replace(tmp_path, path)
@@ -0,0 +1,25 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.pantry import rebuild_pantry_index
+
+
+class Command(BaseCommand):
+    """Построение обратного индекса ингредиентов."""
+
+    help = (
+        'Строит обратный индекс ингредиент -> рецепты для подбора рецептов '
+        'по имеющимся продуктам и очищает журнал изменений индекса.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        index = rebuild_pantry_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Индекс построен: {len(index.recipe_ids)} рецептов, '
+                f'{len(index.ingredient_ids)} ингредиентов за '
+                f'{perf_counter() - started:.1f} с.',
+            ),
+        )
@@ -0,0 +1,52 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.constants import SIMILAR_RECIPES_COUNT
+from recipes.similarity import rebuild_similar_recipes
+
+
+class Command(BaseCommand):
+    """Построение индекса похожих рецептов."""
+
+    help = (
+        'Строит разреженную матрицу рецептов по ингредиентам и заполняет '
+        'таблицу похожих рецептов по косинусной близости.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=SIMILAR_RECIPES_COUNT,
+            help='Кол-во похожих рецептов на рецепт.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=256,
+            help='Кол-во строк матрицы в одном блоке умножения.',
+        )
+
+    def handle(self, *args, **options):
+        """Перестроение индекса с выводом прогресса."""
+        started = perf_counter()
+        created = 0
+
+        def progress(count):
+            nonlocal created
+            created += count
+            self.stdout.write(f'Сохранено связей: {created}')
+
+        index = rebuild_similar_recipes(
+            options['count'],
+            options['batch_size'],
+            progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Индекс построен: {index.matrix.shape[0]} рецептов, '
+                f'{index.matrix.shape[1]} ингредиентов за '
+                f'{perf_counter() - started:.1f} с.',
+            ),
+        )
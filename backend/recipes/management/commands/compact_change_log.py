@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.changelog import compact_change_log
+
+
+class Command(BaseCommand):
+    """Сжатие журнала изменений избранного, корзины и подписок."""
+
+    help = (
+        'Удаляет старые записи журнала изменений, перекрытые более поздними '
+        'записями о тех же объектах. Запускается периодически, например '
+        'из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.CHANGE_LOG_COMPACT_AFTER,
+            help='Возраст сжимаемых записей в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        deleted = compact_change_log(options['older_than'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Журнал сжат, удалено записей: {deleted}'),
+        )
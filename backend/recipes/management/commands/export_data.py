@@ -0,0 +1,66 @@
+import sys
+
+from django.core.management import BaseCommand
+
+from recipes.exports import (
+    EXPORT_FORMATS,
+    EXPORTS,
+    export_rows,
+    get_export_filename,
+)
+
+
+class Command(BaseCommand):
+    """Выгрузка данных для аналитики."""
+
+    help = (
+        'Выгружает рецепты, пользователей, избранное, корзину или подписки '
+        'в CSV или JSONL. Строки читаются серверным курсором и пишутся '
+        'частями, поэтому память не зависит от объёма выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=EXPORTS)
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='csv',
+            dest='export_format',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать выгрузку в gzip.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки, "-" — стандартный вывод. По умолчанию '
+            'имя строится по данным и дате.',
+        )
+
+    def handle(self, *args, **options):
+        name = options['name']
+        model, columns = EXPORTS[name]
+        output = options['output'] or get_export_filename(
+            name,
+            options['export_format'],
+            options['gzip'],
+        )
+        chunks = export_rows(
+            model.objects.order_by('pk'),
+            columns,
+            options['export_format'],
+            options['gzip'],
+        )
+        if output == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        size = 0
+        with open(output, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+                size += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f'Выгрузка записана в {output}, байт: {size}'),
+        )
@@ -0,0 +1,65 @@
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from recipes.images import get_executor, needs_variants, process_image
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Построение уменьшенных копий загруженных изображений."""
+
+    help = (
+        'Строит уменьшенные копии фото рецептов и аватаров, для которых '
+        'их ещё нет или изображение сменилось.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии всех изображений.',
+        )
+
+    def handle(self, *args, **options):
+        """Обработка изображений в пуле потоков IMAGE_WORKERS."""
+        self.processed = self.failed = 0
+        pending = set()
+        for model, field in ((Recipe, 'image'), (User, 'avatar')):
+            for instance in (
+                model.objects.exclude(**{field: ''})
+                .exclude(**{f'{field}__isnull': True})
+                .only('pk', field, f'{field}_variants')
+                .iterator()
+            ):
+                if options['force'] or needs_variants(instance, field):
+                    pending.add(
+                        get_executor().submit(
+                            process_image,
+                            model,
+                            instance.pk,
+                            field,
+                        ),
+                    )
+                if len(pending) >= settings.IMAGE_WORKERS * 4:
+                    pending = self.collect(pending, FIRST_COMPLETED)
+        self.collect(pending, ALL_COMPLETED)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обработано изображений: {self.processed}, '
+                f'ошибок: {self.failed}',
+            ),
+        )
+
+    def collect(self, pending, return_when):
+        done, pending = wait(pending, return_when=return_when)
+        for future in done:
+            if future.exception() is None:
+                self.processed += 1
+            else:
+                self.failed += 1
+        return pending
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from api.cache import bump_generation
+from recipes.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    """Пересчёт рейтингов рецептов."""
+
+    help = (
+        'Пересчитывает рейтинги popular и trending по добавлениям в '
+        'избранное и корзину. Запускается периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать с нуля с учётом удалений из избранного.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        updated = refresh_rankings(options['full'], options['batch_size'])
+        bump_generation('rankings')
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинги пересчитаны, рецептов: {updated}'),
+        )
@@ -0,0 +1,243 @@
+from array import array
+from datetime import timedelta
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeRanking,
+    ShoppingCart,
+    Tag,
+)
+from recipes.rankings import refresh_rankings
+from users.models import Subscription
+
+User = get_user_model()
+
+BENCHMARK_PREFIX = 'bench_'
+BENCHMARK_PASSWORD = 'bench_password'
+BENCHMARK_IMAGE = 'media/benchmark.png'
+HISTORY_SECONDS = 90 * 24 * 60 * 60
+
+
+class Command(BaseCommand):
+    """Наполнение базы данных объёмами для нагрузочного тестирования."""
+
+    help = (
+        'Создаёт пользователей, рецепты, избранное, корзины и подписки '
+        'пакетными вставками для нагрузочного тестирования API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=40,
+            help='Среднее кол-во избранных рецептов на пользователя.',
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=8,
+            help='Среднее кол-во рецептов в корзине пользователя.',
+        )
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=15,
+            help='Среднее кол-во подписок пользователя.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        """Пакетное создание объектов для бенчмарка."""
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not tag_ids or not ingredient_ids:
+            raise CommandError(
+                'Сначала загрузите теги и ингредиенты: '
+                'import_tags, import_ingredients.',
+            )
+        if User.objects.filter(
+            username__startswith=BENCHMARK_PREFIX,
+        ).exists():
+            raise CommandError(
+                'Данные для бенчмарка уже загружены, '
+                'пересоздайте базу данных.',
+            )
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(
+            user_ids,
+            options['recipes'],
+            tag_ids,
+            ingredient_ids,
+        )
+        self.create_user_recipes(
+            Favorite,
+            user_ids,
+            recipe_ids,
+            options['favorites'],
+        )
+        self.create_user_recipes(
+            ShoppingCart,
+            user_ids,
+            recipe_ids,
+            options['carts'],
+        )
+        self.create_subscriptions(user_ids, options['subscriptions'])
+        refresh_rankings(full=True, batch_size=self.batch_size)
+        self.stdout.write(
+            self.style.SUCCESS('Данные для бенчмарка загружены!'),
+        )
+
+    def skewed_index(self, size):
+        """Индекс со смещением к началу: популярные объекты встречаются
+        чаще остальных."""
+        return int(size * self.random.random() ** 3)
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def create_users(self, amount):
+        password = make_password(BENCHMARK_PASSWORD)
+        for start in range(0, amount, self.batch_size):
+            with transaction.atomic():
+                self.bulk_create(
+                    User,
+                    [
+                        User(
+                            username=f'{BENCHMARK_PREFIX}{number}',
+                            email=f'{BENCHMARK_PREFIX}{number}@example.com',
+                            first_name=f'Имя {number}',
+                            last_name=f'Фамилия {number}',
+                            password=password,
+                        )
+                        for number in range(
+                            start,
+                            min(start + self.batch_size, amount),
+                        )
+                    ],
+                )
+        self.stdout.write(f'Пользователей создано: {amount}')
+        return array(
+            'q',
+            User.objects.filter(
+                username__startswith=BENCHMARK_PREFIX,
+            ).order_by('id').values_list('id', flat=True),
+        )
+
+    def create_recipes(self, user_ids, amount, tag_ids, ingredient_ids):
+        recipe_ids = array('q')
+        for start in range(0, amount, self.batch_size):
+            recipes = [
+                Recipe(
+                    author_id=user_ids[self.skewed_index(len(user_ids))],
+                    name=f'Рецепт {number}',
+                    text=f'Описание рецепта {number}. ' * 10,
+                    cooking_time=self.random.randint(1, 180),
+                    image=BENCHMARK_IMAGE,
+                )
+                for number in range(
+                    start,
+                    min(start + self.batch_size, amount),
+                )
+            ]
+            with transaction.atomic():
+                self.bulk_create(Recipe, recipes)
+                recipe_tags = []
+                recipe_ingredients = []
+                for recipe in recipes:
+                    recipe_ids.append(recipe.id)
+                    recipe_tags.extend(
+                        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                        for tag_id in self.random.sample(
+                            tag_ids,
+                            self.random.randint(1, min(3, len(tag_ids))),
+                        )
+                    )
+                    recipe_ingredients.extend(
+                        RecipeIngredient(
+                            recipe_id=recipe.id,
+                            ingredient_id=ingredient_id,
+                            amount=self.random.randint(1, 500),
+                        )
+                        for ingredient_id in self.random.sample(
+                            ingredient_ids,
+                            self.random.randint(
+                                3,
+                                min(12, len(ingredient_ids)),
+                            ),
+                        )
+                    )
+                self.bulk_create(Recipe.tags.through, recipe_tags)
+                self.bulk_create(RecipeIngredient, recipe_ingredients)
+                self.bulk_create(
+                    RecipeRanking,
+                    [RecipeRanking(recipe_id=recipe.id) for recipe in recipes],
+                )
+        self.stdout.write(f'Рецептов создано: {amount}')
+        return recipe_ids
+
+    def create_user_recipes(self, model, user_ids, recipe_ids, average):
+        objects = []
+        total = 0
+        now = timezone.now()
+        for user_id in user_ids:
+            chosen = {
+                recipe_ids[self.skewed_index(len(recipe_ids))]
+                for _ in range(self.random.randint(0, average * 2))
+            }
+            objects.extend(
+                model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    added_at=now - timedelta(
+                        seconds=self.random.randint(0, HISTORY_SECONDS),
+                    ),
+                )
+                for recipe_id in chosen
+            )
+            if len(objects) >= self.batch_size:
+                total += len(objects)
+                self.bulk_create(model, objects)
+                objects = []
+        total += len(objects)
+        self.bulk_create(model, objects)
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural} созданы: {total}',
+        )
+
+    def create_subscriptions(self, user_ids, average):
+        objects = []
+        total = 0
+        for user_id in user_ids:
+            authors = {
+                user_ids[self.skewed_index(len(user_ids))]
+                for _ in range(self.random.randint(0, average * 2))
+            }
+            authors.discard(user_id)
+            objects.extend(
+                Subscription(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+            if len(objects) >= self.batch_size:
+                total += len(objects)
+                self.bulk_create(Subscription, objects)
+                objects = []
+        total += len(objects)
+        self.bulk_create(Subscription, objects)
+        self.stdout.write(f'Подписок создано: {total}')
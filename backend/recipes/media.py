@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from recipes.constants import IMAGE_SIZES
+from recipes.images import IMAGE_FORMATS, variant_name
+from recipes.models import MediaBlob, Recipe
+from recipes.storage import get_media_storage
+
+User = get_user_model()
+
+MEDIA_FIELDS = {Recipe: 'image', User: 'avatar'}
+
+
+def stored_media(instance):
+    """Имя файла изображения объекта, сохранённое в базе данных."""
+    if instance._state.adding:
+        return ''
+    return type(instance).objects.filter(pk=instance.pk).values_list(
+        MEDIA_FIELDS[type(instance)],
+        flat=True,
+    ).first() or ''
+
+
+def change_refcount(name, delta):
+    if name:
+        MediaBlob.objects.filter(name=name).update(
+            refcount=F('refcount') + delta,
+        )
+
+
+def update_references(old, new):
+    if old != new:
+        change_refcount(new, 1)
+        change_refcount(old, -1)
+
+
+def count_references():
+    """Число ссылок на каждый файл изображений: {имя: число}."""
+    references = {}
+    for model, field in MEDIA_FIELDS.items():
+        for name, count in (
+            model.objects.exclude(**{field: ''})
+            .exclude(**{f'{field}__isnull': True})
+            .order_by()
+            .values_list(field)
+            .annotate(count=Count('pk'))
+            .iterator()
+        ):
+            references[name] = references.get(name, 0) + count
+    return references
+
+
+def recount_references(batch_size=1000):
+    """Пересчёт MediaBlob.refcount по ссылкам из базы данных."""
+    references = count_references()
+    with transaction.atomic():
+        blobs = []
+        for blob in MediaBlob.objects.select_for_update().iterator():
+            refcount = references.get(blob.name, 0)
+            if blob.refcount != refcount:
+                blob.refcount = refcount
+                blobs.append(blob)
+        MediaBlob.objects.bulk_update(
+            blobs,
+            ('refcount',),
+            batch_size=batch_size,
+        )
+    return len(blobs)
+
+
+def delete_variants(name):
+    for size in IMAGE_SIZES:
+        for extension, _ in IMAGE_FORMATS:
+            default_storage.delete(variant_name(name, size, extension))
+
+
+def collect_garbage(grace, dry_run=False):
+    """Удаление файлов без ссылок, которые не загружались повторно
+    дольше grace секунд, вместе с их уменьшенными копиями."""
+    storage = get_media_storage()
+    with transaction.atomic():
+        names = list(
+            MediaBlob.objects.select_for_update(skip_locked=True)
+            .filter(
+                refcount__lte=0,
+                touched_at__lt=timezone.now() - timedelta(seconds=grace),
+            )
+            .values_list('name', flat=True),
+        )
+        if not dry_run:
+            for name in names:
+                storage.purge(name)
+                delete_variants(name)
+            MediaBlob.objects.filter(name__in=names).delete()
+    return names
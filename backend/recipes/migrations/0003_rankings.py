@@ -0,0 +1,96 @@
+# Generated by Django 4.2.16 on 2026-10-19 06:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_rankings(apps, schema_editor):
+    """Нулевые рейтинги уже существующих рецептов. Добавлениям в избранное
+    и корзину до миграции проставляется дата публикации рецепта, чтобы они
+    не считались новыми. Рейтинги рассчитает первый refresh_rankings."""
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeRanking = apps.get_model("recipes", "RecipeRanking")
+    for model_name in ("Favorite", "ShoppingCart"):
+        apps.get_model("recipes", model_name).objects.update(
+            added_at=models.Subquery(
+                Recipe.objects.filter(pk=models.OuterRef("recipe_id")).values(
+                    "pub_date"
+                )
+            )
+        )
+    RecipeRanking.objects.bulk_create(
+        (
+            RecipeRanking(recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.values_list("pk", flat=True)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_similarrecipe"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="favorite",
+            name="added_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата добавления",
+            ),
+        ),
+        migrations.AddField(
+            model_name="shoppingcart",
+            name="added_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата добавления",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RecipeRanking",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ranking",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                ("popular", models.FloatField(default=0, verbose_name="Популярность")),
+                (
+                    "trending",
+                    models.FloatField(
+                        default=0, verbose_name="Популярность за последние дни"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(null=True, verbose_name="Дата пересчёта"),
+                ),
+            ],
+            options={
+                "verbose_name": "Рейтинг рецепта",
+                "verbose_name_plural": "Рейтинги рецептов",
+                "indexes": [
+                    models.Index(
+                        fields=["-popular", "-recipe"], name="recipe_ranking_popular"
+                    ),
+                    models.Index(
+                        fields=["-trending", "-recipe"], name="recipe_ranking_trending"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
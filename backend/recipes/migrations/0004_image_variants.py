@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_rankings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="Уменьшенные копии фото"
+            ),
+        ),
+    ]
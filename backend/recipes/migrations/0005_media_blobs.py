@@ -0,0 +1,68 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:07
+
+from django.db import migrations, models
+import django.utils.timezone
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=recipes.storage.get_media_storage,
+                upload_to="media/",
+                verbose_name="Фото рецепта",
+            ),
+        ),
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Имя файла"
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(verbose_name="Размер в байтах"),
+                ),
+                (
+                    "refcount",
+                    models.IntegerField(default=0, verbose_name="Число ссылок"),
+                ),
+                (
+                    "touched_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Дата последней загрузки",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл изображения",
+                "verbose_name_plural": "Файлы изображений",
+                "indexes": [
+                    models.Index(
+                        fields=["refcount", "touched_at"], name="media_blob_garbage"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_change_log(apps, schema_editor):
+    """Записи о добавлении для уже существующих избранного, корзины и
+    подписок."""
+    ChangeLog = apps.get_model("recipes", "ChangeLog")
+    sources = (
+        (apps.get_model("recipes", "Favorite"), "favorite", "recipe_id"),
+        (apps.get_model("recipes", "ShoppingCart"), "shopping_cart", "recipe_id"),
+        (apps.get_model("users", "Subscription"), "subscription", "author_id"),
+    )
+    for model, kind, field in sources:
+        ChangeLog.objects.bulk_create(
+            (
+                ChangeLog(user_id=user_id, kind=kind, object_id=object_id, added=True)
+                for user_id, object_id in model.objects.order_by("pk").values_list(
+                    "user_id", field
+                )
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0005_media_blobs"),
+        ("users", "0003_media_blobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("favorite", "Избранное"),
+                            ("shopping_cart", "Корзина"),
+                            ("subscription", "Подписка"),
+                        ],
+                        max_length=16,
+                        verbose_name="Раздел",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(verbose_name="Рецепт или автор"),
+                ),
+                ("added", models.BooleanField(verbose_name="Добавлено")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Дата изменения"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="changes",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Журнал изменений",
+                "ordering": ("id",),
+                "indexes": [
+                    models.Index(fields=["user", "id"], name="change_log_user"),
+                    models.Index(
+                        fields=["user", "kind", "object_id", "id"],
+                        name="change_log_object",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_change_log, migrations.RunPython.noop),
+    ]
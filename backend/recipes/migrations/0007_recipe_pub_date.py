@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_change_log"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-pub_date", "-id"], name="recipe_pub_date"),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from recipes import constants
+from recipes.storage import get_media_storage
 
 User = get_user_model()
 
@@ -22,6 +24,11 @@ class AbstractUserRecipe(models.Model):
         related_name='%(class)s',
         verbose_name='Пользователь',
     )
+    added_at = models.DateTimeField(
+        'Дата добавления',
+        default=timezone.now,
+        db_index=True,
+    )
 
     class Meta:
         abstract = True
@@ -101,7 +108,16 @@ class Recipe(models.Model):
         Tag,
         verbose_name='Теги',
     )
-    image = models.ImageField('Фото рецепта', upload_to='media/')
+    image = models.ImageField(
+        'Фото рецепта',
+        upload_to='media/',
+        storage=get_media_storage,
+    )
+    image_variants = models.JSONField(
+        'Уменьшенные копии фото',
+        default=dict,
+        blank=True,
+    )
     name = models.CharField(
         'Название',
         max_length=constants.NAME_SLUG_MAX_CHAR,
@@ -120,6 +136,12 @@ class Recipe(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date',
+            ),
+        )
 
     def __str__(self):
         return self.name[: constants.MAX_CHAR]
@@ -222,3 +244,139 @@ class ShoppingCart(AbstractUserRecipe):
                 name='unique_shopping_cart_recipe',
             ),
         )
+
+
+class SimilarRecipe(models.Model):
+    """Модель похожих рецептов по составу ингредиентов."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField('Косинусная близость')
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe} ({self.score:.2f})'
+
+
+class RecipeRanking(models.Model):
+    """Модель рейтингов рецептов для сортировки по популярности."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт',
+    )
+    popular = models.FloatField('Популярность', default=0)
+    trending = models.FloatField('Популярность за последние дни', default=0)
+    updated_at = models.DateTimeField('Дата пересчёта', null=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = (
+            models.Index(
+                fields=('-popular', '-recipe'),
+                name='recipe_ranking_popular',
+            ),
+            models.Index(
+                fields=('-trending', '-recipe'),
+                name='recipe_ranking_trending',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe}: {self.popular:.2f} / {self.trending:.2f}'
+
+
+class MediaBlob(models.Model):
+    """Модель файлов изображений с адресацией по содержимому."""
+
+    name = models.CharField(
+        'Имя файла',
+        max_length=constants.MEDIA_NAME_MAX_CHAR,
+        unique=True,
+    )
+    size = models.PositiveBigIntegerField('Размер в байтах')
+    refcount = models.IntegerField('Число ссылок', default=0)
+    touched_at = models.DateTimeField(
+        'Дата последней загрузки',
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'Файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+        indexes = (
+            models.Index(
+                fields=('refcount', 'touched_at'),
+                name='media_blob_garbage',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
+
+
+class ChangeLog(models.Model):
+    """Модель журнала изменений избранного, корзины и подписок
+    пользователя для синхронизации клиентов."""
+
+    class Kind(models.TextChoices):
+        FAVORITE = 'favorite', 'Избранное'
+        SHOPPING_CART = 'shopping_cart', 'Корзина'
+        SUBSCRIPTION = 'subscription', 'Подписка'
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='changes',
+        verbose_name='Пользователь',
+    )
+    kind = models.CharField(
+        'Раздел',
+        max_length=constants.CHANGE_KIND_MAX_CHAR,
+        choices=Kind.choices,
+    )
+    object_id = models.PositiveBigIntegerField('Рецепт или автор')
+    added = models.BooleanField('Добавлено')
+    created_at = models.DateTimeField('Дата изменения', default=timezone.now)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = (
+            models.Index(fields=('user', 'id'), name='change_log_user'),
+            models.Index(
+                fields=('user', 'kind', 'object_id', 'id'),
+                name='change_log_object',
+            ),
+        )
+
+    def __str__(self):
+        return (
+            f'{self.user}: {self.get_kind_display()} {self.object_id} '
+            f'{"добавлен" if self.added else "удалён"}'
+        )
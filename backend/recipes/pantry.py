@@ -0,0 +1,194 @@
+import os
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+
+from recipes.journal import (
+    JournaledIndex,
+    get_journal_size,
+    truncate_journal,
+    write_journal,
+)
+from recipes.similarity import recipe_ingredient_pairs
+
+_index = {'mtime': None, 'value': None}
+_lock = Lock()
+
+
+class PantryIndex(JournaledIndex):
+    """Обратный индекс: ингредиент -> номера строк рецептов.
+
+    Основа хранится в npz-файле в формате CSC (indptr и номера строк по
+    каждому ингредиенту) и перестраивается командой build_pantry_index.
+    Изменения рецептов между перестроениями берутся из журнала.
+    """
+
+    def __init__(self, indptr, rows, recipe_ids, sizes, ingredient_ids):
+        self.indptr = indptr
+        self.rows = rows
+        self.recipe_ids = recipe_ids
+        self.sizes = sizes
+        self.ingredient_ids = ingredient_ids
+        self.columns = {
+            ingredient_id: column
+            for column, ingredient_id in enumerate(ingredient_ids.tolist())
+        }
+        self.reset_journal()
+
+    @classmethod
+    def from_pairs(cls, recipe_ids, ingredient_ids):
+        recipes, rows = np.unique(recipe_ids, return_inverse=True)
+        ingredients, columns = np.unique(ingredient_ids, return_inverse=True)
+        order = np.lexsort((rows, columns))
+        indptr = np.zeros(len(ingredients) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(columns, minlength=len(ingredients)),
+            out=indptr[1:],
+        )
+        return cls(
+            indptr,
+            rows[order].astype(np.int32),
+            recipes,
+            np.bincount(rows, minlength=len(recipes)).astype(np.int32),
+            ingredients,
+        )
+
+    @classmethod
+    def from_database(cls):
+        return cls.from_pairs(*recipe_ingredient_pairs())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['indptr'],
+                data['rows'],
+                data['recipe_ids'],
+                data['sizes'],
+                data['ingredient_ids'],
+            )
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        with open(tmp_path, 'wb') as file:
+            np.savez(
+                file,
+                indptr=self.indptr,
+                rows=self.rows,
+                recipe_ids=self.recipe_ids,
+                sizes=self.sizes,
+                ingredient_ids=self.ingredient_ids,
+            )
+        os.replace(tmp_path, path)
+
+    def match(self, ingredient_ids):
+        """Рецепты, в которых есть хотя бы один ингредиент из набора,
+        по возрастанию числа недостающих ингредиентов, затем от новых к
+        старым: (recipe_ids, missing)."""
+        ingredient_ids = set(ingredient_ids)
+        columns = [
+            self.columns[ingredient_id]
+            for ingredient_id in ingredient_ids
+            if ingredient_id in self.columns
+        ]
+        postings = [
+            self.rows[self.indptr[column]:self.indptr[column + 1]]
+            for column in columns
+        ]
+        counts = np.bincount(
+            np.concatenate(postings or [np.empty(0, dtype=np.int32)]),
+            minlength=len(self.recipe_ids),
+        )
+        counts[self.masked] = 0
+        rows = np.flatnonzero(counts)
+        recipe_ids = self.recipe_ids[rows]
+        missing = self.sizes[rows] - counts[rows]
+        extra = [
+            (recipe_id, len(ingredients) - len(ingredients & ingredient_ids))
+            for recipe_id, ingredients in self.overlay.items()
+            if ingredients & ingredient_ids
+        ]
+        if extra:
+            extra_ids, extra_missing = zip(*extra)
+            recipe_ids = np.concatenate((recipe_ids, extra_ids))
+            missing = np.concatenate((missing, extra_missing))
+        order = np.lexsort((-recipe_ids, missing))
+        return recipe_ids[order], missing[order]
+
+
+class PantryMatches:
+    """Результат подбора как последовательность пар (recipe_id, missing)
+    для пагинатора: в объекты Python переводится только запрошенный
+    срез."""
+
+    def __init__(self, recipe_ids, missing):
+        self.recipe_ids = recipe_ids
+        self.missing = missing
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(
+                zip(
+                    self.recipe_ids[index].tolist(),
+                    self.missing[index].tolist(),
+                ),
+            )
+        return int(self.recipe_ids[index]), int(self.missing[index])
+
+
+def get_index_path():
+    return Path(settings.INDEX_DIR) / 'pantry.npz'
+
+
+def get_journal_path():
+    return Path(settings.INDEX_DIR) / 'pantry.journal'
+
+
+def get_pantry_index():
+    """Индекс с применённым журналом. Без файла индекса строится в
+    памяти процесса из базы данных."""
+    path = get_index_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        mtime = None
+    with _lock:
+        if _index['value'] is None or _index['mtime'] != mtime:
+            _index['value'] = (
+                PantryIndex.from_database()
+                if mtime is None
+                else PantryIndex.load(path)
+            )
+            _index['mtime'] = mtime
+        _index['value'].sync_journal(get_journal_path())
+        return _index['value']
+
+
+def update_pantry_index(recipe):
+    """Запись нового набора ингредиентов рецепта в журнал индекса."""
+    write_journal(
+        get_journal_path(),
+        recipe.id,
+        recipe.recipe_ingredients.values_list('ingredient_id', flat=True),
+    )
+
+
+def remove_from_pantry_index(recipe_id):
+    """Запись удаления рецепта в журнал индекса."""
+    write_journal(get_journal_path(), recipe_id, ())
+
+
+def rebuild_pantry_index():
+    """Перестроение индекса из базы данных с очисткой журнала."""
+    offset = get_journal_size(get_journal_path())
+    index = PantryIndex.from_database()
+    index.save(get_index_path())
+    truncate_journal(get_journal_path(), offset)
+    return index
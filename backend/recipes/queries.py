@@ -0,0 +1,21 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(queryset, field):
+    """Кол-во строк queryset, ссылающихся полем field на объект внешнего
+    запроса.
+
+    В отличие от Count() по связи подзапрос не добавляет GROUP BY по всей
+    таблице и отбрасывается из COUNT(*) пагинации.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+        ),
+        0,
+    )
@@ -0,0 +1,105 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.constants import (
+    FAVORITE_WEIGHT,
+    POPULAR_HALF_LIFE,
+    SHOPPING_CART_WEIGHT,
+    TRENDING_HALF_LIFE,
+)
+from recipes.models import Favorite, Recipe, RecipeRanking, ShoppingCart
+
+RANKING_EVENTS = (
+    (Favorite, FAVORITE_WEIGHT),
+    (ShoppingCart, SHOPPING_CART_WEIGHT),
+)
+
+
+def decay(seconds, half_life):
+    return 0.5 ** (max(seconds, 0) / half_life)
+
+
+def collect_scores(since, now):
+    """Вклад добавлений в избранное и корзину за период (since, now]
+    в рейтинги на момент now: {recipe_id: [popular, trending]}.
+
+    Добавления группируются по часам, поэтому выборка не растёт с числом
+    пользователей.
+    """
+    scores = defaultdict(lambda: [0.0, 0.0])
+    for model, weight in RANKING_EVENTS:
+        events = model.objects.filter(added_at__lte=now)
+        if since is not None:
+            events = events.filter(added_at__gt=since)
+        for recipe_id, hour, count in (
+            events.order_by()
+            .values_list('recipe_id', TruncHour('added_at'))
+            .annotate(count=Count('id'))
+            .iterator()
+        ):
+            age = (now - hour).total_seconds()
+            score = scores[recipe_id]
+            score[0] += weight * count * decay(age, POPULAR_HALF_LIFE)
+            score[1] += weight * count * decay(age, TRENDING_HALF_LIFE)
+    return scores
+
+
+def refresh_rankings(full=False, batch_size=5000):
+    """Пересчёт рейтингов рецептов.
+
+    Рейтинг — сумма добавлений в избранное и корзину с весом, который
+    убывает вдвое за период полураспада. Поэтому при обычном пересчёте
+    сохранённые рейтинги умножаются на общий коэффициент затухания и к ним
+    прибавляются только добавления после прошлого пересчёта. Удаления из
+    избранного и корзины учитываются при полном пересчёте (full=True).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        since = RecipeRanking.objects.aggregate(
+            since=Max('updated_at'),
+        )['since']
+        full = full or since is None
+        RecipeRanking.objects.bulk_create(
+            (
+                RecipeRanking(recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    ranking__isnull=True,
+                ).values_list('pk', flat=True).iterator()
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        if full:
+            since = None
+            RecipeRanking.objects.update(
+                popular=0,
+                trending=0,
+                updated_at=now,
+            )
+        else:
+            elapsed = (now - since).total_seconds()
+            RecipeRanking.objects.update(
+                popular=F('popular') * decay(elapsed, POPULAR_HALF_LIFE),
+                trending=F('trending') * decay(elapsed, TRENDING_HALF_LIFE),
+                updated_at=now,
+            )
+        scores = collect_scores(since, now)
+        recipe_ids = list(scores)
+        for start in range(0, len(recipe_ids), batch_size):
+            rankings = RecipeRanking.objects.in_bulk(
+                recipe_ids[start:start + batch_size],
+            ).values()
+            for ranking in rankings:
+                popular, trending = scores[ranking.recipe_id]
+                ranking.popular += popular
+                ranking.trending += trending
+            RecipeRanking.objects.bulk_update(
+                rankings,
+                ('popular', 'trending'),
+                batch_size=batch_size,
+            )
+    return len(scores)
@@ -0,0 +1,322 @@
+import os
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from recipes.constants import (
+    SIMILAR_RECIPES_CANDIDATES,
+    SIMILAR_RECIPES_COUNT,
+)
+from recipes.journal import (
+    JournaledIndex,
+    get_journal_size,
+    truncate_journal,
+    write_journal,
+)
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+_index = {'mtime': None, 'value': None}
+_lock = Lock()
+
+
+def recipe_ingredient_pairs():
+    """Массивы recipe_id и ingredient_id всех ингредиентов рецептов."""
+    pairs = np.fromiter(
+        (
+            value
+            for pair in RecipeIngredient.objects.order_by().values_list(
+                'recipe_id',
+                'ingredient_id',
+            ).iterator(chunk_size=10000)
+            for value in pair
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+class IngredientMatrix(JournaledIndex):
+    """Разреженная матрица рецептов по ингредиентам.
+
+    Строки нормированы, поэтому произведение строк даёт косинусную
+    близость наборов ингредиентов. Изменения рецептов между
+    перестроениями берутся из журнала.
+    """
+
+    def __init__(self, matrix, recipe_ids, ingredient_ids):
+        self.matrix = matrix
+        self.recipe_ids = recipe_ids
+        self.ingredient_ids = ingredient_ids
+        self.columns = {
+            ingredient_id: column
+            for column, ingredient_id in enumerate(ingredient_ids.tolist())
+        }
+        self.rows = {
+            recipe_id: row for row, recipe_id in enumerate(recipe_ids.tolist())
+        }
+        self.reset_journal()
+
+    @classmethod
+    def from_pairs(cls, recipe_ids, ingredient_ids):
+        recipes, rows = np.unique(recipe_ids, return_inverse=True)
+        ingredients, columns = np.unique(ingredient_ids, return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+            shape=(len(recipes), len(ingredients)),
+        )
+        norms = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+        matrix = sparse.diags(1 / norms).dot(matrix).tocsr()
+        return cls(matrix.astype(np.float32), recipes, ingredients)
+
+    @classmethod
+    def from_database(cls):
+        return cls.from_pairs(*recipe_ingredient_pairs())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            matrix = sparse.csr_matrix(
+                (data['data'], data['indices'], data['indptr']),
+                shape=tuple(data['shape']),
+            )
+            return cls(matrix, data['recipe_ids'], data['ingredient_ids'])
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        with open(tmp_path, 'wb') as file:
+            np.savez(
+                file,
+                data=self.matrix.data,
+                indices=self.matrix.indices,
+                indptr=self.matrix.indptr,
+                shape=np.array(self.matrix.shape),
+                recipe_ids=self.recipe_ids,
+                ingredient_ids=self.ingredient_ids,
+            )
+        os.replace(tmp_path, path)
+
+    def vector(self, ingredient_ids):
+        """Нормированный вектор набора ингредиентов."""
+        ingredient_ids = set(ingredient_ids)
+        columns = [
+            self.columns[ingredient_id]
+            for ingredient_id in ingredient_ids
+            if ingredient_id in self.columns
+        ]
+        vector = sparse.csr_matrix(
+            (
+                np.full(len(columns), 1, dtype=np.float32),
+                (np.zeros(len(columns), dtype=np.int64), columns),
+            ),
+            shape=(1, self.matrix.shape[1]),
+        )
+        if columns:
+            vector.data /= np.sqrt(len(ingredient_ids))
+        return vector
+
+    def scores(self, ingredient_ids, exclude=None):
+        """Близость набора ингредиентов ко всем рецептам индекса и
+        журнала: (recipe_ids, scores) только для рецептов с общими
+        ингредиентами."""
+        ingredient_ids = frozenset(ingredient_ids)
+        scores = self.matrix.dot(self.vector(ingredient_ids).T).tocoo()
+        rows, values = scores.row, scores.data
+        keep = ~self.masked[rows]
+        if exclude in self.rows:
+            keep &= rows != self.rows[exclude]
+        ids, values = self.recipe_ids[rows[keep]], values[keep]
+        extra = [
+            (
+                recipe_id,
+                len(ingredients & ingredient_ids)
+                / np.sqrt(len(ingredients) * len(ingredient_ids)),
+            )
+            for recipe_id, ingredients in self.overlay.items()
+            if recipe_id != exclude and ingredients & ingredient_ids
+        ]
+        if extra:
+            extra_ids, extra_scores = zip(*extra)
+            ids = np.concatenate((ids, np.array(extra_ids, dtype=ids.dtype)))
+            values = np.concatenate(
+                (values, np.array(extra_scores, dtype=values.dtype)),
+            )
+        return ids, values
+
+
+def top_k(ids, scores, count):
+    """count наибольших значений по убыванию, при равенстве — по id."""
+    if len(scores) > count:
+        best = np.argpartition(-scores, count - 1)[:count]
+        ids, scores = ids[best], scores[best]
+    order = np.lexsort((ids, -scores))
+    return ids[order], scores[order]
+
+
+def iter_neighbours(index, count, batch_size):
+    """Похожие рецепты для всех строк индекса, блоками по batch_size строк:
+    одно умножение разреженных матриц на блок."""
+    transposed = index.matrix.T.tocsc()
+    for start in range(0, index.matrix.shape[0], batch_size):
+        block = index.matrix[start:start + batch_size].dot(transposed).tocsr()
+        block.setdiag(0, k=start)
+        block.eliminate_zeros()
+        for offset in range(block.shape[0]):
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            ids, scores = top_k(
+                index.recipe_ids[block.indices[begin:end]],
+                block.data[begin:end],
+                count,
+            )
+            yield int(index.recipe_ids[start + offset]), ids, scores
+
+
+def get_index_path():
+    return Path(settings.INDEX_DIR) / 'similar_recipes.npz'
+
+
+def get_journal_path():
+    return Path(settings.INDEX_DIR) / 'similar_recipes.journal'
+
+
+def get_index():
+    """Индекс из файла с применённым журналом, перечитывается после
+    перестроения."""
+    path = get_index_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if _index['mtime'] != mtime:
+            _index['value'] = IngredientMatrix.load(path)
+            _index['mtime'] = mtime
+        _index['value'].sync_journal(get_journal_path())
+        return _index['value']
+
+
+def make_rows(recipe_id, ids, scores):
+    return [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id, score=score)
+        for similar_id, score in zip(ids.tolist(), scores.tolist())
+    ]
+
+
+def rebuild_similar_recipes(
+    count=SIMILAR_RECIPES_COUNT,
+    batch_size=256,
+    callback=None,
+):
+    """Полное перестроение индекса и таблицы похожих рецептов с
+    очисткой журнала."""
+    offset = get_journal_size(get_journal_path())
+    index = IngredientMatrix.from_database()
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        rows = []
+        for recipe_id, ids, scores in iter_neighbours(
+            index,
+            count,
+            batch_size,
+        ):
+            rows.extend(make_rows(recipe_id, ids, scores))
+            if len(rows) >= batch_size * count:
+                SimilarRecipe.objects.bulk_create(rows)
+                if callback is not None:
+                    callback(len(rows))
+                rows = []
+        SimilarRecipe.objects.bulk_create(rows)
+        if callback is not None:
+            callback(len(rows))
+    index.save(get_index_path())
+    truncate_journal(get_journal_path(), offset)
+    return index
+
+
+def update_similar_recipes(recipe, count=SIMILAR_RECIPES_COUNT):
+    """Пересчёт похожих рецептов после создания или изменения рецепта.
+
+    Новый набор ингредиентов записывается в журнал индекса, поэтому
+    рецепт сразу становится кандидатом для остальных во всех процессах.
+    Соседи рецепта считаются по индексу одним умножением вектора на
+    матрицу. Рецепт добавляется в списки соседей, где он ближе последнего
+    элемента.
+    """
+    if not get_index_path().exists():
+        return
+    ingredient_ids = list(
+        recipe.recipe_ingredients.values_list('ingredient_id', flat=True),
+    )
+    write_journal(get_journal_path(), recipe.id, ingredient_ids)
+    ids, scores = get_index().scores(ingredient_ids, exclude=recipe.id)
+    ids, scores = top_k(ids, scores, SIMILAR_RECIPES_CANDIDATES)
+    existing = Recipe.objects.filter(pk__in=ids.tolist()).values_list(
+        'pk',
+        flat=True,
+    )
+    existing = np.isin(ids, list(existing))
+    ids, scores = ids[existing], scores[existing]
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe=recipe).delete()
+        SimilarRecipe.objects.filter(similar=recipe).delete()
+        SimilarRecipe.objects.bulk_create(
+            make_rows(recipe.id, ids[:count], scores[:count]),
+            ignore_conflicts=True,
+        )
+        candidates = dict(zip(ids.tolist(), scores.tolist()))
+        lists = {
+            item['recipe_id']: item
+            for item in SimilarRecipe.objects.filter(
+                recipe_id__in=candidates,
+            )
+            .order_by()
+            .values('recipe_id')
+            .annotate(size=Count('id'), lowest=Min('score'))
+        }
+        added, full = [], []
+        for recipe_id, score in candidates.items():
+            current = lists.get(recipe_id)
+            if current is None or current['size'] < count:
+                added.append(recipe_id)
+            elif score > current['lowest']:
+                added.append(recipe_id)
+                full.append(recipe_id)
+        SimilarRecipe.objects.bulk_create(
+            [
+                SimilarRecipe(
+                    recipe_id=recipe_id,
+                    similar=recipe,
+                    score=candidates[recipe_id],
+                )
+                for recipe_id in added
+            ],
+            ignore_conflicts=True,
+        )
+        trim_similar_recipes(full, count)
+
+
+def remove_from_similar_index(recipe_id):
+    """Запись удаления рецепта в журнал индекса."""
+    if get_index_path().exists():
+        write_journal(get_journal_path(), recipe_id, ())
+
+
+def trim_similar_recipes(recipe_ids, count):
+    """Удаление лишних элементов из списков похожих рецептов."""
+    extra, seen = [], {}
+    for pk, recipe_id in SimilarRecipe.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).order_by('recipe_id', '-score', 'similar_id').values_list(
+        'pk',
+        'recipe_id',
+    ):
+        seen[recipe_id] = seen.get(recipe_id, 0) + 1
+        if seen[recipe_id] > count:
+            extra.append(pk)
+    SimilarRecipe.objects.filter(pk__in=extra).delete()
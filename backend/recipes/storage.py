@@ -0,0 +1,70 @@
+import hashlib
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+_storage = None
+
+
+def hash_content(content):
+    """SHA-256 и размер содержимого файла."""
+    digest = hashlib.sha256()
+    size = 0
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return digest.hexdigest(), size
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """Хранилище с адресацией по содержимому.
+
+    Файл сохраняется под именем <каталог>/<ab>/<sha256>.<расширение>,
+    поэтому одинаковые изображения хранятся один раз. Файлы учитываются
+    в MediaBlob и удаляются только командой collect_media, когда на них
+    не остаётся ссылок.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest, size = hash_content(content)
+        path = PurePosixPath(name)
+        name = str(path.parent / digest[:2] / f'{digest}{path.suffix.lower()}')
+        self.register(name, size)
+        if not self.exists(name):
+            name = super().save(name, content, max_length)
+        return name
+
+    def register(self, name, size):
+        """Учёт файла до записи на диск: строка, заблокированная сборкой
+        мусора, дождётся её завершения, и удалённый файл запишется снова.
+        """
+        MediaBlob = apps.get_model('recipes', 'MediaBlob')
+        MediaBlob.objects.bulk_create(
+            (MediaBlob(name=name, size=size, touched_at=timezone.now()),),
+            update_conflicts=True,
+            unique_fields=('name',),
+            update_fields=('touched_at',),
+        )
+
+    def delete(self, name):
+        """Файл может быть общим для нескольких объектов, поэтому
+        удаляется только сборкой мусора."""
+
+    def purge(self, name):
+        super().delete(name)
+
+
+def get_media_storage():
+    global _storage
+    if _storage is None:
+        _storage = HashedFileSystemStorage()
+    return _storage
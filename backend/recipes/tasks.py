@@ -0,0 +1,49 @@
+from django.apps import apps
+
+from api.cache import bump_generation
+from recipes.images import needs_variants, process_image
+from recipes.models import Recipe, RecipeShortUrl
+from recipes.pantry import update_pantry_index
+from recipes.similarity import update_similar_recipes
+from tasks.queue import task
+
+
+@task
+def update_recipe_indexes(recipe_id):
+    """Обновление похожих рецептов и индекса подбора по продуктам."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is not None:
+        update_similar_recipes(recipe)
+        update_pantry_index(recipe)
+        bump_generation('recipes')
+
+
+@task
+def process_image_variants(model, pk, field):
+    """Построение уменьшенных копий изображения поля field объекта
+    модели model ('app_label.Model')."""
+    model = apps.get_model(model)
+    process_image(model, pk, field)
+    bump_generation('recipes' if model is Recipe else 'users')
+
+
+def schedule_image_processing(instance, field, force=False):
+    """Постановка в очередь построения копий, если изображение
+    изменилось."""
+    if force or needs_variants(instance, field):
+        return process_image_variants.delay(
+            instance._meta.label,
+            instance.pk,
+            field,
+        )
+    return None
+
+
+@task
+def create_short_url(recipe_id, short_url):
+    """Сохранение короткой ссылки рецепта."""
+    if Recipe.objects.filter(pk=recipe_id).exists():
+        RecipeShortUrl.objects.get_or_create(
+            recipe_id=recipe_id,
+            short_url=short_url,
+        )
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeShortUrl,
+    ShoppingCart,
+    Tag,
+)
+from tasks.models import Task
+from users.models import Subscription, User
+
+ROWS = 100
+
+
+class AdminChangelistQueriesTests(TestCase):
+    """Число SQL-запросов списков админ-зоны не зависит от кол-ва строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password',
+        )
+        users = User.objects.bulk_create(
+            User(
+                username=f'user{index}',
+                email=f'user{index}@example.com',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+            )
+            for index in range(ROWS)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег {index}', slug=f'tag{index}')
+            for index in range(ROWS)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(ROWS)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'Рецепт {index}',
+                text=f'Описание {index}',
+                cooking_time=index + 1,
+                image=f'media/recipe{index}.jpg',
+            )
+            for index, user in enumerate(users)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for index, recipe in enumerate(recipes)
+            for tag in (tags[index], tags[index - 1])
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for index, recipe in enumerate(recipes)
+            for ingredient in (ingredients[index], ingredients[index - 1])
+        )
+        RecipeShortUrl.objects.bulk_create(
+            RecipeShortUrl(recipe=recipe, short_url=f's{index}')
+            for index, recipe in enumerate(recipes)
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=user, recipe=recipes[index - 1])
+                for index, user in enumerate(users)
+            )
+        Subscription.objects.bulk_create(
+            Subscription(user=user, author=users[index - 1])
+            for index, user in enumerate(users)
+        )
+        Token.objects.bulk_create(
+            Token(key=f'{index:040}', user=user)
+            for index, user in enumerate(users)
+        )
+        Task.objects.bulk_create(
+            Task(name='update_recipe_indexes', args=[recipe.pk])
+            for recipe in recipes
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url, model_admin, rows):
+        with mock.patch.object(model_admin, 'list_per_page', rows):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def test_changelist_queries(self):
+        for model, model_admin in admin.site._registry.items():
+            opts = model._meta
+            with self.subTest(model=opts.label):
+                self.assertGreaterEqual(model.objects.count(), ROWS)
+                url = reverse(
+                    f'admin:{opts.app_label}_{opts.model_name}_changelist',
+                )
+                # Первое открытие заполняет кэши фильтров.
+                self.count_queries(url, model_admin, 10)
+                self.assertEqual(
+                    self.count_queries(url, model_admin, 10),
+                    self.count_queries(url, model_admin, ROWS),
+                )
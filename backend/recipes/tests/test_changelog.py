@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from recipes.changelog import get_changes, get_settled_cursor
+from recipes.models import ChangeLog
+from users.models import User
+
+
+@override_settings(SYNC_SETTLE_TIME=5)
+class GetChangesTests(TestCase):
+    """Курсор журнала изменений при параллельных транзакциях."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@example.com',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password',
+        )
+
+    def log(self, pk, object_id, added=True):
+        return ChangeLog.objects.create(
+            id=pk,
+            user=self.user,
+            kind=ChangeLog.Kind.FAVORITE,
+            object_id=object_id,
+            added=added,
+        )
+
+    def settle(self):
+        """Прошло SYNC_SETTLE_TIME секунд."""
+        ChangeLog.objects.update(created_at=F('created_at') - timedelta(seconds=6))
+
+    def test_out_of_order_commit(self):
+        # Транзакция с id=2 зафиксирована раньше транзакции с id=1.
+        self.log(2, object_id=20)
+        changes, cursor, has_more = get_changes(self.user, 0, 100)
+        self.assertEqual(cursor, 0)
+        self.assertEqual(changes['favorite'], {'added': [], 'removed': []})
+        self.assertFalse(has_more)
+        self.log(1, object_id=10)
+        self.settle()
+        changes, cursor, _ = get_changes(self.user, cursor, 100)
+        self.assertEqual(cursor, 2)
+        self.assertEqual(changes['favorite']['added'], [10, 20])
+
+    def test_stops_at_first_unsettled_entry(self):
+        self.log(1, object_id=10)
+        self.settle()
+        self.log(2, object_id=20)
+        self.log(3, object_id=30)
+        ChangeLog.objects.filter(pk=3).update(
+            created_at=F('created_at') - timedelta(seconds=6),
+        )
+        changes, cursor, _ = get_changes(self.user, 0, 100)
+        self.assertEqual(cursor, 1)
+        self.assertEqual(changes['favorite']['added'], [10])
+        self.assertEqual(get_settled_cursor(self.user), 1)
+
+    def test_limit(self):
+        for pk in range(1, 4):
+            self.log(pk, object_id=pk * 10, added=pk != 2)
+        self.settle()
+        changes, cursor, has_more = get_changes(self.user, 0, 2)
+        self.assertEqual((cursor, has_more), (2, True))
+        self.assertEqual(
+            changes['favorite'],
+            {'added': [10], 'removed': [20]},
+        )
+        changes, cursor, has_more = get_changes(self.user, cursor, 2)
+        self.assertEqual((cursor, has_more), (3, False))
+        self.assertEqual(get_settled_cursor(self.user), 3)
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.shortcuts import redirect
+from django.views.decorators.cache import cache_control
 import short_url
 
 
+@cache_control(public=True, max_age=settings.SHORT_URL_CACHE_MAX_AGE)
 def short_redirect_view(request, short_link):
     """Редиректит на страницу рецепта по короткой ссылке."""
     pk = short_url.decode_url(short_link)
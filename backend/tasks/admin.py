@@ -0,0 +1,41 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import registry
+
+
+class TaskNameFilter(admin.SimpleListFilter):
+    """Фильтр по именам зарегистрированных задач без выборки из
+    очереди."""
+
+    title = 'задача'
+    parameter_name = 'name'
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in sorted(registry)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(name=self.value())
+        return queryset
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Интерфейс админ-зоны фоновых задач."""
+
+    list_display = ('name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', TaskNameFilter)
+    show_full_result_count = False
+    readonly_fields = ('attempts', 'locked_until', 'error', 'created_at')
+    actions = ('retry',)
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Task.Status.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+            locked_until=None,
+        )
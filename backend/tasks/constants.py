@@ -0,0 +1,11 @@
+TASK_NAME_MAX_CHAR = 255
+
+TASK_STATUS_MAX_CHAR = 16
+
+TASK_MAX_ATTEMPTS = 3
+
+TASK_RETRY_DELAY = 30
+
+TASK_TIMEOUT = 5 * 60
+
+TASK_CLAIM_BATCH = 10
@@ -0,0 +1,56 @@
+import os
+import signal
+from time import sleep
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from prometheus_client import start_http_server
+
+from api.metrics import get_registry
+from tasks.queue import claim_task, run_task
+
+
+class Command(BaseCommand):
+    """Воркер фоновой очереди задач."""
+
+    help = 'Выполняет задачи фоновой очереди до получения SIGTERM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда в очереди не останется задач.',
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            default=settings.TASKS_METRICS_PORT,
+            help='Порт HTTP-сервера метрик Prometheus, 0 — не запускать.',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if options['metrics_port']:
+            directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            start_http_server(options['metrics_port'], registry=get_registry())
+        processed = 0
+        while not self.stopping:
+            task = claim_task()
+            if task is None:
+                if options['burst']:
+                    break
+                sleep(settings.TASKS_POLL_INTERVAL)
+                continue
+            self.stdout.write(f'{task.name}: {run_task(task)}')
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Выполнено задач: {processed}'),
+        )
+
+    def stop(self, signum, frame):
+        """Завершение после текущей задачи."""
+        self.stopping = True
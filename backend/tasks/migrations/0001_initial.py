@@ -0,0 +1,95 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, verbose_name="Задача")),
+                (
+                    "args",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="Аргументы"
+                    ),
+                ),
+                (
+                    "kwargs",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Именованные аргументы"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="Состояние",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="Попытки"),
+                ),
+                (
+                    "max_attempts",
+                    models.PositiveSmallIntegerField(
+                        default=3, verbose_name="Максимум попыток"
+                    ),
+                ),
+                (
+                    "run_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Запустить после",
+                    ),
+                ),
+                (
+                    "locked_until",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Выполняется до"
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(blank=True, verbose_name="Последняя ошибка"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача",
+                "verbose_name_plural": "Задачи",
+                "ordering": ("run_at", "id"),
+                "indexes": [
+                    models.Index(fields=["status", "run_at"], name="task_queue")
+                ],
+            },
+        ),
+    ]
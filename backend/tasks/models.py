@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils import timezone
+
+from tasks import constants
+
+
+class Task(models.Model):
+    """Модель задачи фоновой очереди."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField('Задача', max_length=constants.TASK_NAME_MAX_CHAR)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    kwargs = models.JSONField(
+        'Именованные аргументы',
+        default=dict,
+        blank=True,
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=constants.TASK_STATUS_MAX_CHAR,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=constants.TASK_MAX_ATTEMPTS,
+    )
+    run_at = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'Выполняется до',
+        null=True,
+        blank=True,
+    )
+    error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'),
+                name='task_queue',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,147 @@
+from datetime import timedelta
+import logging
+from time import perf_counter
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.metrics import record_task
+from tasks.constants import (
+    TASK_CLAIM_BATCH,
+    TASK_MAX_ATTEMPTS,
+    TASK_RETRY_DELAY,
+    TASK_TIMEOUT,
+)
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskFunction:
+    """Функция, которую можно выполнить в фоновой очереди."""
+
+    def __init__(self, func, max_attempts, retry_delay, timeout):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Постановка в очередь в текущей транзакции: воркер увидит задачу
+        только после её фиксации. При TASKS_EAGER задача выполняется в
+        процессе после фиксации транзакции."""
+        return self.schedule(0, *args, **kwargs)
+
+    def schedule(self, countdown, *args, **kwargs):
+        """Постановка в очередь с запуском не раньше чем через countdown
+        секунд."""
+        if settings.TASKS_EAGER:
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+
+def task(
+    func=None,
+    *,
+    max_attempts=TASK_MAX_ATTEMPTS,
+    retry_delay=TASK_RETRY_DELAY,
+    timeout=TASK_TIMEOUT,
+):
+    """Регистрация функции как фоновой задачи.
+
+    Аргументы задачи сохраняются в JSON, поэтому передаются id объектов,
+    а не сами объекты.
+    """
+
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, retry_delay, timeout)
+        registry[task_function.name] = task_function
+        return task_function
+
+    return decorator if func is None else decorator(func)
+
+
+def get_timeout(name):
+    task_function = registry.get(name)
+    return TASK_TIMEOUT if task_function is None else task_function.timeout
+
+
+def claim_task():
+    """Захват задачи условным UPDATE: из воркеров, выбравших одну и ту же
+    задачу, строку изменит только один. Задачи упавших воркеров
+    захватываются снова после истечения locked_until."""
+    now = timezone.now()
+    available = Q(status=Task.Status.PENDING, run_at__lte=now) | Q(
+        status=Task.Status.RUNNING,
+        locked_until__lt=now,
+    )
+    for pk, name in Task.objects.filter(available).values_list(
+        'pk',
+        'name',
+    )[:TASK_CLAIM_BATCH]:
+        if Task.objects.filter(available, pk=pk).update(
+            status=Task.Status.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=get_timeout(name)),
+        ):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run_task(task):
+    """Выполнение захваченной задачи: успешная удаляется, упавшая
+    возвращается в очередь с экспоненциальной задержкой, а после
+    max_attempts попыток помечается ошибкой."""
+    task_function = registry.get(task.name)
+    started = perf_counter()
+    try:
+        if task_function is None:
+            raise LookupError(f'Задача {task.name} не зарегистрирована.')
+        if task.attempts > task.max_attempts:
+            raise RuntimeError('Превышено число попыток.')
+        task_function.func(*task.args, **task.kwargs)
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', task.name)
+        close_old_connections()
+        queued = Task.objects.filter(pk=task.pk, status=Task.Status.RUNNING)
+        if task_function is not None and task.attempts < task.max_attempts:
+            result = 'retry'
+            queued.update(
+                status=Task.Status.PENDING,
+                run_at=timezone.now() + timedelta(
+                    seconds=task_function.retry_delay
+                    * 2 ** (task.attempts - 1),
+                ),
+                locked_until=None,
+                error=traceback.format_exc(),
+            )
+        else:
+            result = 'failed'
+            queued.update(
+                status=Task.Status.FAILED,
+                locked_until=None,
+                error=traceback.format_exc(),
+            )
+    else:
+        result = 'done'
+        Task.objects.filter(pk=task.pk).delete()
+    finally:
+        close_old_connections()
+    record_task(task.name, result, perf_counter() - started)
+    return result
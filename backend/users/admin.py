@@ -2,6 +2,9 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from recipes.exports import make_export_actions
+from recipes.models import Recipe
+from recipes.queries import count_related
 from users.models import Subscription
 
 admin.site.empty_value_display = 'Не задано'
@@ -14,16 +17,34 @@ class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'count_subscribers', 'count_recipes')
     search_fields = ('username', 'email')
     list_display_links = ('username',)
+    show_full_result_count = False
+    actions = make_export_actions('users')
 
-    @admin.display(description='Кол-во подписчиков')
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                subscribers_count=count_related(
+                    Subscription.objects,
+                    'author',
+                ),
+                recipes_count=count_related(Recipe.objects, 'author'),
+            )
+        )
+
+    @admin.display(
+        description='Кол-во подписчиков',
+        ordering='subscribers_count',
+    )
     def count_subscribers(self, obj):
         """Возвращает кол-во подписчиков."""
-        return obj.subscriptions_to_author.count()
+        return obj.subscribers_count
 
-    @admin.display(description='Кол-во рецептов')
+    @admin.display(description='Кол-во рецептов', ordering='recipes_count')
     def count_recipes(self, obj):
         """Возвращает кол-во рецептов."""
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 @admin.register(Subscription)
@@ -31,5 +52,13 @@ class SubscriptionAdmin(admin.ModelAdmin):
     """Интерфейс админ-зоны подписок."""
 
     list_display = ('user', 'author')
-    search_fields = ('user',)
+    list_select_related = ('user', 'author')
+    search_fields = (
+        'user__username__exact',
+        'user__email__exact',
+        'author__username__exact',
+    )
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
     list_display_links = ('user',)
+    actions = make_export_actions('subscriptions')
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_variants",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="Уменьшенные копии аватара"
+            ),
+        ),
+    ]
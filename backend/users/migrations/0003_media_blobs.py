@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-19 07:07
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=recipes.storage.get_media_storage,
+                upload_to="avatars",
+                verbose_name="Аватар пользователя",
+            ),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from recipes.storage import get_media_storage
 from users import constants
 
 
@@ -35,6 +36,12 @@ class User(AbstractUser):
         blank=True,
         null=True,
         upload_to='avatars',
+        storage=get_media_storage,
+    )
+    avatar_variants = models.JSONField(
+        'Уменьшенные копии аватара',
+        default=dict,
+        blank=True,
     )
 
     class Meta: